@@ -1,22 +1,193 @@
-import yfinance as yf
+import numpy as np
 import dash
-from dash import dcc, html, Input, Output, State, dash_table
+from dash import dcc, html, Input, Output, State, ClientsideFunction, Patch, dash_table
 import plotly.graph_objs as go
+import plotly.io as pio
 import pandas as pd
-from datetime import datetime, timedelta
+import json
+import os
+import queue
+import threading
+import time
+import zlib
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from flask import Response, jsonify
 from flask_caching import Cache
+from flask_compress import Compress
+from apscheduler.schedulers.background import BackgroundScheduler
 from urllib.parse import parse_qs
 
+try:
+    import fcntl
+except ImportError:  # Windows: блокировки прогрева нет, прогрев идет в каждом процессе
+    fcntl = None
+from chain_format import CHAIN_COLUMN_DTYPES, decode_chain_arrays, encode_chain
+from key_levels import (build_level_index, compute_key_levels, find_gamma_flips, first_gamma_flip,
+                        window_bounds, window_sums)
+from live_hub import LiveHub
+from snapshot_store import SnapshotStore
+from market_data import create_provider
+
 # Инициализация Dash приложения
 app = dash.Dash(__name__, suppress_callback_exceptions=True)
 
-# Настройка кэширования
-cache = Cache(app.server, config={
-    'CACHE_TYPE': 'filesystem',
-    'CACHE_DIR': 'cache-directory',
-    'CACHE_THRESHOLD': 100
-})
-cache.clear()
+# Сжатие ответов (колбэки, лейаут, бандлы JS): brotli, если браузер его принимает, иначе gzip.
+# Параметр compress у Dash включает только gzip, поэтому Flask-Compress подключается напрямую.
+# Кэш Flask-Compress не используется: он по URL, а все колбэки идут POST на один URL.
+# RESPONSE_COMPRESSION=0 - без сжатия, если ответы сжимает прокси перед приложением
+RESPONSE_COMPRESSION = os.environ.get('RESPONSE_COMPRESSION', '1') == '1'
+if RESPONSE_COMPRESSION:
+    # Потоки SSE (/live/<тикер>) не сжимаются: сжатие буферизует события
+    app.server.config.update(COMPRESS_ALGORITHM=['br', 'gzip'], COMPRESS_BR_LEVEL=4, COMPRESS_LEVEL=6,
+                             COMPRESS_STREAMS=False)
+    Compress(app.server)
+
+# История снапшотов: каждый запрос цепочки и пачка минутных баров пишутся в SNAPSHOT_STORE_DIR.
+# REPLAY_START (ISO-время, без зоны - по Нью-Йорку) включает воспроизведение: вместо Yahoo
+# графики строятся по сохраненной истории, REPLAY_SPEED - сколько секунд истории проходит за секунду
+SNAPSHOT_STORE_DIR = os.environ.get('SNAPSHOT_STORE_DIR', 'snapshot-store')
+SNAPSHOT_STORE_ENABLED = os.environ.get('SNAPSHOT_STORE_ENABLED', '1') == '1'
+REPLAY_START = os.environ.get('REPLAY_START')
+REPLAY_SPEED = float(os.environ.get('REPLAY_SPEED', '1'))
+
+# Источник рыночных данных (см. market_data.py): yahoo, record (Yahoo с записью фикстур
+# в MARKET_DATA_FIXTURES) или replay (только фикстуры, задержка MARKET_DATA_LATENCY_MS на запрос)
+market_data = create_provider(os.environ.get('MARKET_DATA_PROVIDER', 'yahoo'),
+                              os.environ.get('MARKET_DATA_FIXTURES', 'market-data-fixtures'),
+                              float(os.environ.get('MARKET_DATA_LATENCY_MS', '0')) / 1000)
+
+# Настройка кэширования: L1 в памяти процесса (LRU по размеру) перед общим кэшем L2.
+# L2 общий для всех воркеров: файловый на одном сервере или Redis
+# (CACHE_L2_TYPE=flask_caching.backends.RedisCache и CACHE_REDIS_URL) для нескольких серверов
+CACHE_CONFIG = {
+    'CACHE_TYPE': 'cache_backends.TwoTierCache',
+    'CACHE_L2_TYPE': os.environ.get('CACHE_L2_TYPE', 'flask_caching.backends.FileSystemCache'),
+    # Воспроизведение не смешивает свои снапшоты с живыми
+    'CACHE_DIR': os.environ.get('CACHE_DIR', 'cache-directory-replay' if REPLAY_START else 'cache-directory'),
+    # Цепочки кэшируются по каждой дате экспирации, поэтому ключей заметно больше 100
+    'CACHE_THRESHOLD': 1000,
+    'CACHE_L1_MAX_BYTES': 256 * 1024 * 1024
+}
+if os.environ.get('CACHE_REDIS_URL'):
+    CACHE_CONFIG['CACHE_REDIS_URL'] = os.environ['CACHE_REDIS_URL']
+cache = Cache(app.server, config=CACHE_CONFIG)
+
+# Время старта процесса: от него считаются прогрев и первый полезный ответ
+BOOT_TIME = time.time()
+
+# Теплый перезапуск: кэш с диска не очищается, снапшоты и минутные бары прошлого запуска
+# проверяются и отдаются как устаревшие, пока идет обновление (WARM_RESTART=0 - холодный старт)
+WARM_RESTART_ENABLED = os.environ.get('WARM_RESTART', '1') == '1'
+if not WARM_RESTART_ENABLED:
+    cache.clear()
+
+
+# Объединение одновременных загрузок (single-flight): по одному ключу (тикер, вид данных, дата)
+# в Yahoo идет один запрос, остальные вызовы ждут его результат. В процессе - через Event,
+# между воркерами - через блокировку flight:{ключ} (cache.cache.acquire_lock: flock рядом с каталогом
+# кэша или SET NX в Redis): пока она есть, другие воркеры ждут появления результата в кэше,
+# а не загружают данные сами.
+SINGLE_FLIGHT_TIMEOUT = 30
+SINGLE_FLIGHT_POLL_INTERVAL = 0.05
+
+_flights = {}
+_flights_guard = threading.Lock()
+_single_flight_stats = {'fetches': 0, 'followers': 0, 'remote_waits': 0, 'remote_hits': 0}
+
+
+def _count_flight(counter):
+    with _flights_guard:
+        _single_flight_stats[counter] += 1
+
+
+# Загрузка под блокировкой ключа; результат мог положить в кэш воркер, державший блокировку до нас
+def _fetch_locked(lock_key, lock, fetch, lookup):
+    try:
+        value = lookup()
+        if value is not None:
+            _count_flight('remote_hits')
+            return value
+        _count_flight('fetches')
+        return fetch()
+    finally:
+        cache.cache.release_lock(lock_key, lock)
+
+
+# Загрузка в процессе-лидере: если ключ уже загружает другой воркер, ждем результат через lookup.
+# Ожидающие не проверяют блокировку, а пытаются ее взять: после лидера (в том числе упавшего)
+# загрузку продолжает один из них, остальные ждут дальше.
+def _fetch_across_workers(key, fetch, lookup):
+    if lookup is None:
+        _count_flight('fetches')
+        return fetch()
+
+    lock_key = f"flight:{key}"
+    lock = cache.cache.acquire_lock(lock_key, SINGLE_FLIGHT_TIMEOUT)
+    if lock is not None:
+        _count_flight('fetches')
+        try:
+            return fetch()
+        finally:
+            cache.cache.release_lock(lock_key, lock)
+
+    _count_flight('remote_waits')
+    deadline = time.time() + SINGLE_FLIGHT_TIMEOUT
+    while time.time() < deadline:
+        time.sleep(SINGLE_FLIGHT_POLL_INTERVAL)
+        value = lookup()
+        if value is not None:
+            _count_flight('remote_hits')
+            return value
+        lock = cache.cache.acquire_lock(lock_key, SINGLE_FLIGHT_TIMEOUT)
+        if lock is not None:
+            return _fetch_locked(lock_key, lock, fetch, lookup)
+    # Блокировку так и не удалось взять (другой воркер завис) - загружаем сами
+    _count_flight('fetches')
+    return fetch()
+
+
+# Функция single-flight: fetch загружает и кэширует данные, lookup читает готовый результат из кэша
+# (None - результата нет). Без lookup объединяются только вызовы внутри процесса.
+def single_flight(key, fetch, lookup=None):
+    with _flights_guard:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = {'done': threading.Event(), 'result': None, 'error': None}
+            _flights[key] = flight
+        else:
+            _single_flight_stats['followers'] += 1
+
+    if not leader:
+        if not flight['done'].wait(SINGLE_FLIGHT_TIMEOUT):
+            return fetch()
+        if flight['error'] is not None:
+            raise flight['error']
+        return flight['result']
+
+    try:
+        # Результат мог попасть в кэш после того, как вызывающий код его там не нашел
+        result = lookup() if lookup is not None else None
+        flight['result'] = result if result is not None else _fetch_across_workers(key, fetch, lookup)
+        return flight['result']
+    except Exception as e:
+        flight['error'] = e
+        raise
+    finally:
+        with _flights_guard:
+            _flights.pop(key, None)
+        flight['done'].set()
+
+
+# Статистика кэша: попадания L1/L2 и промахи по группам ключей (chain, snapshot, bars, ...)
+# и число объединенных загрузок
+@app.server.route('/cache-stats')
+def cache_stats():
+    with _flights_guard:
+        single_flight_stats = dict(_single_flight_stats)
+    return jsonify({**cache.cache.stats(), 'single_flight': single_flight_stats, 'live': {**live_hub.stats(), 'streams': _live_streams['open']}})
 
 # Список разрешенных пользователей Telegram
 ALLOWED_USERS = ["313", "@cronoq", "@avg1987", "@VictorIziumschii", "@robertcz84", "@tatifad", "@Andrey_Maryev", "@Stepanov_SV", "@martin5711", "@dkirhlarov", "@o_stmn", "@Jus_Urfin", "@IgorM215", "@Lbanki", "@artjomeif", "@ViktorAlenchikov", "@PavelZam", "@ruslan_rms", "@kserginfo", "@Yan_yog", "@IFin82", "@niqo5586", "@d200984", "@Zhenya_jons", "@Chili_palmer", "375291767178", "79122476671", "@manival515", "@isaevmike", "@ilapirova", "@rra3483", "@armen_lalaian", "@olegstamatov", "@Banderas111", "@andreymiamimoscow", "436642455545", "@gyuszijaro", "@helenauvarova", "@Rewire", "@garik_bale", "@KJurginiene", "@kiloperza", "@YLT777", "@Sea_Master_07", "380958445987", "@Yuriy_Kutafin", "@di_floww", "@dokulakov", "@travelpro5", "@yrchik91", "@euko2", "@Wrt666", "@Galexprivate", "@DrWinsent", "@rishat11kh", "37123305995", "@Yura_Bok", "@FaidenSA", "79956706060", "358451881908", "@jonytvester", "79160779977", "@maxpower3674", "@maxpower4566", "@maxpower7894", "@maxpower6635", "@Renat258", "@bagh0lder", "79057666666", "@Bapik_t", "@SergeyM072", "380672890848", "@Sergey_Bill", "@dmitrylan", "@Qwertyid", "@puzyatkin_kolbosyatkin", "@mrseboch", "79219625180", "@Vitrade134", "@Vaness_IB", "@iririchs", "@Natalijapan", "@ElenaRussianSirena", "@Andrii36362", "@Kuzmitskiy_Maksim", "79281818128", "@Romich408", "@Maksim8022", "@Nikitin_Kirill8", "@art_kirakozov", "@davribr", "14253942333", "@Korney21", "@Andrei_Pishvanov", "@iahis", "@Aik99999", "37126548141", "@vadim_gr77", "@makoltsov", "@alexndsn", "@option2037", "@futuroid", "79852696802", "@Serge_Kost", "@iurii_serbin", "79103333226", "@Roma_pr", "@ElenaERMACK", "@Alexrut1588", "17044214938", "@canapsis", "79646560911", "@kazamerican", "@sterner2021", "@RudolfPlett", "@Nikolay_Detkovskiy", "@Geosma55", "@DmitriiDubov87", "@sergeytrotskii", "@yuryleon", "@dmitriy_kashintsev", "@Maxabr91", "@kingkrys", "@ZERHIUS", "@Aydar_Ka", "@DrKoledgio", "@holod_new", "@procarbion", "@msyarcev", "17866060066", "@DmitriiUSB", "@Jephrin", "@MdEYE", "@Deonis_14", "@Mistershur", '@MakenzyM', "@OchirMan08", "@MarkAlim8", "@v_zmitrovich", "@amsol111", "@Atomicgo18", "@djek70", "79043434519", "@iii_logrus", "@Groove12", "@sergeewpavel", "@RomaTomilov", "@Markokorp", "t_gora", "@luciusmagnus", "@AlexandrM_1976", "@shstrnn", "@nzdr15", "@DmitriiPetrenko", "@Arsen911", "@Norfolk_san", "@zhaKOSHKA", "79104358892", "@Ikprof", "@ambidekstr10", "393203005915", "@Louren325", "@GorAnt90", "@sunfire_08", "@Sergiy1234567", "@vlastand"]
@@ -31,17 +202,284 @@ def normalize_ticker(ticker):
     return index_map.get(ticker.upper(), ticker.upper())
 
 
-# Функция получения данных по опционам с кэшированием
-@cache.memoize(timeout=60)
-def get_option_data(ticker, expirations):
-    ticker = normalize_ticker(ticker)
+# Замер стадий колбэков (fetch / pandas / figure) для бенчмарков. Включается в текущем потоке
+# start_stage_timing(), stage_checkpoint(stage) относит время с предыдущей отметки к стадии stage.
+# Без start_stage_timing() отметки ничего не делают.
+_stage_timing = threading.local()
+
+
+def start_stage_timing():
+    _stage_timing.timings = {}
+    _stage_timing.last = time.perf_counter()
+
+
+def stage_checkpoint(stage):
+    timings = getattr(_stage_timing, 'timings', None)
+    if timings is None:
+        return
+    now = time.perf_counter()
+    timings[stage] = timings.get(stage, 0.0) + now - _stage_timing.last
+    _stage_timing.last = now
+
+
+# Функция завершения замера: {стадия: секунды}
+def stop_stage_timing():
+    timings = getattr(_stage_timing, 'timings', None) or {}
+    _stage_timing.timings = None
+    return timings
+
+
+snapshot_store = SnapshotStore(SNAPSHOT_STORE_DIR)
+
+# Часы воспроизведения: момент истории, с которого начато воспроизведение, и его скорость
+_replay_clock = {'start': None, 'started_at': None, 'speed': 1.0}
+
+
+# Функция запуска (start - секунды epoch) или остановки (start=None) воспроизведения
+def set_replay_clock(start, speed=1.0):
+    _replay_clock.update(start=start, started_at=time.time(), speed=speed)
+
+
+def is_replay_mode():
+    return _replay_clock['start'] is not None
+
+
+# Текущий момент воспроизведения (секунды epoch) или None в живом режиме
+def replay_time():
+    if not is_replay_mode():
+        return None
+    return _replay_clock['start'] + (time.time() - _replay_clock['started_at']) * _replay_clock['speed']
+
+
+# Текущее время для графиков: при воспроизведении - момент истории
+def market_now():
+    return datetime.fromtimestamp(replay_time()) if is_replay_mode() else datetime.now()
+
+
+if REPLAY_START:
+    replay_start = pd.Timestamp(REPLAY_START)
+    if replay_start.tz is None:
+        replay_start = replay_start.tz_localize('America/New_York')
+    set_replay_clock(replay_start.timestamp(), REPLAY_SPEED)
+    print(f"Воспроизведение истории с {replay_start} (x{REPLAY_SPEED})")
+
+# Запись истории идет в одном фоновом потоке, чтобы диск не задерживал колбэки
+_snapshot_store_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='snapshot-store')
+
+
+def _write_history(method, ticker, *args):
     try:
-        stock = yf.Ticker(ticker)
-        available_dates = stock.options
-        print(f"Доступные даты экспирации для {ticker}: {available_dates}")
+        method(ticker, *args)
     except Exception as e:
-        print(f"Ошибка загрузки данных {ticker}: {e}")
-        return None, [], None, None
+        print(f"Ошибка записи истории {ticker}: {e}")
+
+
+def record_history(method, ticker, *args):
+    if SNAPSHOT_STORE_ENABLED and not is_replay_mode():
+        _snapshot_store_executor.submit(_write_history, method, ticker, *args)
+
+
+# Максимальное число одновременных загрузок цепочек опционов (по одной на дату экспирации)
+OPTION_CHAIN_MAX_WORKERS = 8
+
+_option_chain_executor = ThreadPoolExecutor(max_workers=OPTION_CHAIN_MAX_WORKERS,
+                                            thread_name_prefix='option-chain')
+
+
+# Функция загрузки цепочки опционов одной даты экспирации
+def fetch_expiration_chain(ticker, expiration):
+    try:
+        return market_data.option_chain(ticker, expiration)
+    except Exception as e:
+        # Ошибка одной даты не должна ломать загрузку остальных
+        print(f"Ошибка загрузки данных для {expiration}: {e}")
+        return None
+
+
+# Время жизни кэша списка дат и цепочки одной даты экспирации (секунды)
+OPTION_CHAIN_TTL = 60
+
+# Цепочка тикера истекает в кэше раньше, чем пересобирается его снапшот (refresh_interval), с запасом
+# на саму сборку: иначе пересборка взяла бы из кэша цепочку прошлой сборки с новым created_at
+OPTION_CHAIN_TTL_MARGIN = 5
+
+
+def option_chain_ttl(ticker):
+    refresh_interval, _ = get_snapshot_refresh_config(ticker)
+    return min(OPTION_CHAIN_TTL, refresh_interval - OPTION_CHAIN_TTL_MARGIN)
+
+
+# Канонический ключ кэша цепочки: один тикер + одна дата экспирации
+def option_chain_cache_key(ticker, expiration):
+    return f"chain:{normalize_ticker(ticker)}:{expiration}"
+
+
+# Функция загрузки цепочки одной даты с записью в кэш и историю.
+# Одновременные запросы одной цепочки (из разных колбэков и воркеров) объединяются в одну загрузку.
+def load_expiration_chain(ticker, expiration):
+    cache_key = option_chain_cache_key(ticker, expiration)
+
+    def fetch():
+        pulled_at = time.time()
+        chain = fetch_expiration_chain(ticker, expiration)
+        if chain is not None:
+            payload = encode_chain(chain)
+            cache.set(cache_key, payload, timeout=option_chain_ttl(ticker))
+            record_history(snapshot_store.write_chains, ticker, pulled_at, {expiration: payload})
+        return chain
+
+    def lookup():
+        payload = cache.get(cache_key)
+        return decode_chain_arrays(payload) if payload is not None else None
+
+    return single_flight(cache_key, fetch, lookup)
+
+
+# Функция параллельной загрузки цепочек по нескольким датам экспирации.
+# Результаты возвращаются в порядке expirations, чтобы объединение было детерминированным.
+def fetch_option_chains(ticker, expirations):
+    if len(expirations) <= 1 or OPTION_CHAIN_MAX_WORKERS <= 1:
+        return [load_expiration_chain(ticker, expiration) for expiration in expirations]
+
+    futures = [_option_chain_executor.submit(load_expiration_chain, ticker, expiration)
+               for expiration in expirations]
+    return [future.result() for future in futures]
+
+
+# Функция получения доступных дат экспирации с кэшированием
+def get_expiration_dates(ticker):
+    ticker = normalize_ticker(ticker)
+    if is_replay_mode():
+        return snapshot_store.read_expirations(ticker, replay_time())
+
+    cache_key = f"dates:{ticker}"
+
+    available_dates = cache.get(cache_key)
+    if available_dates is not None:
+        return available_dates
+
+    def fetch():
+        try:
+            available_dates = market_data.expirations(ticker)
+            print(f"Доступные даты экспирации для {ticker}: {available_dates}")
+        except Exception as e:
+            print(f"Ошибка загрузки данных {ticker}: {e}")
+            return []
+
+        if available_dates:
+            cache.set(cache_key, available_dates, timeout=OPTION_CHAIN_TTL)
+        return available_dates
+
+    return single_flight(cache_key, fetch, lambda: cache.get(cache_key))
+
+
+# Сколько кэшируются дневные бары (секунды)
+DAILY_BARS_TTL = 300
+
+
+# Функция получения дневных баров с кэшированием и объединением одновременных загрузок
+def get_daily_bars(ticker, period):
+    ticker = normalize_ticker(ticker)
+    cache_key = f"daily:{ticker}:{period}"
+
+    bars = cache.get(cache_key)
+    if bars is None:
+        def fetch():
+            bars = market_data.daily_bars(ticker, period)
+            if not bars.empty:
+                cache.set(cache_key, bars, timeout=DAILY_BARS_TTL)
+            return bars
+
+        bars = single_flight(cache_key, fetch, lambda: cache.get(cache_key))
+
+    # Вызывающий код добавляет к барам колонки, а кэшированный DataFrame общий
+    return bars.copy()
+
+
+# Функция получения цепочек по датам экспирации: каждая дата кэшируется отдельно
+# (в компактном колоночном формате chain_format), из Yahoo загружаются только отсутствующие даты
+def get_option_chains(ticker, expirations):
+    ticker = normalize_ticker(ticker)
+    if is_replay_mode():
+        recorded = snapshot_store.read_chains_at(ticker, replay_time(), expirations)
+        return [recorded.get(expiration) for expiration in expirations]
+
+    cache_keys = [option_chain_cache_key(ticker, expiration) for expiration in expirations]
+    chains = {expiration: decode_chain_arrays(encoded) if encoded is not None else None
+              for expiration, encoded in zip(expirations, cache.get_many(*cache_keys))}
+
+    missing = [expiration for expiration in expirations if chains[expiration] is None]
+    if missing:
+        chains.update(zip(missing, fetch_option_chains(ticker, missing)))
+
+    return [chains[expiration] for expiration in expirations]
+
+
+# Безрисковая ставка для модели Блэка-Шоулза
+RISK_FREE_RATE = 0.04
+# Минимальное время до экспирации (в годах) - один час, чтобы гамма 0DTE не уходила в бесконечность
+MIN_TIME_TO_EXPIRATION = 1 / (365 * 24)
+# Колонки объединенной цепочки, которые суммируются по страйку
+OPTION_DATA_COLUMNS = ['Call OI', 'Call Volume', 'Put OI', 'Put Volume', 'Net GEX', 'AG']
+
+
+# Функция расчета времени до экспирации в годах (экспирация - 16:00 по Нью-Йорку)
+def years_to_expiration(expiration, now=None):
+    expiration_time = pd.Timestamp(f"{expiration} 16:00", tz='America/New_York')
+    now = now if now is not None else pd.Timestamp.now(tz='America/New_York')
+    return max((expiration_time - now).total_seconds() / (365 * 24 * 60 * 60), MIN_TIME_TO_EXPIRATION)
+
+
+# Векторизованная гамма Блэка-Шоулза для массивов страйков, IV и времени до экспирации.
+# Контракты без IV (или с нулевой IV) получают нулевую гамму.
+def black_scholes_gamma(spot_price, strikes, implied_vols, years, rate=RISK_FREE_RATE):
+    valid = (implied_vols > 0) & (strikes > 0) & (years > 0)
+    sigma = np.where(valid, implied_vols, 1.0)
+    safe_strikes = np.where(valid, strikes, spot_price)
+    sigma_sqrt_t = sigma * np.sqrt(years)
+
+    d1 = (np.log(spot_price / safe_strikes) + (rate + 0.5 * sigma ** 2) * years) / sigma_sqrt_t
+    gamma = np.exp(-0.5 * d1 ** 2) / (np.sqrt(2 * np.pi) * spot_price * sigma_sqrt_t)
+    return np.where(valid, gamma, 0.0)
+
+
+# Функция расчета гамма-экспозиции по всем страйкам и экспирациям за один проход.
+# chains - цепочки отдельных дат (словари массивов, в порядке expirations), результат - одна строка на страйк.
+# GEX считается в долларах на 1% движения цены: gamma * OI * 100 (контракт) * spot^2 * 0.01.
+def build_exposure_data(expirations, chains, spot_price, now=None):
+    now = now if now is not None else pd.Timestamp.now(tz='America/New_York')
+    columns = {name: np.concatenate([chain[name] for chain in chains]) for name, _ in CHAIN_COLUMN_DTYPES}
+    years = np.repeat([years_to_expiration(expiration, now) for expiration in expirations],
+                      [len(chain['strike']) for chain in chains])
+
+    strikes = columns['strike'].astype(float)
+    call_oi = columns['Call OI'].astype(float)
+    put_oi = columns['Put OI'].astype(float)
+    scale = 100 * spot_price ** 2 * 0.01
+
+    call_gex = black_scholes_gamma(spot_price, strikes, columns['Call IV'].astype(float), years) * call_oi * scale
+    put_gex = black_scholes_gamma(spot_price, strikes, columns['Put IV'].astype(float), years) * put_oi * scale
+
+    all_chains = pd.DataFrame({
+        'strike': strikes,
+        'Call OI': columns['Call OI'],
+        'Call Volume': columns['Call Volume'],
+        'Put OI': columns['Put OI'],
+        'Put Volume': columns['Put Volume'],
+        'Net GEX': call_gex - put_gex,
+        'AG': call_gex + put_gex,
+    })
+
+    combined_data = all_chains.groupby('strike', as_index=False, sort=True)[OPTION_DATA_COLUMNS].sum()
+    combined_data['Net GEX'] = combined_data['Net GEX'].round(1)
+    combined_data['AG'] = combined_data['AG'].round(1)
+    return combined_data
+
+
+# Функция получения данных по опционам: цепочки берутся из кэша по датам и объединяются при запросе
+def get_option_data(ticker, expirations, spot_price=None):
+    ticker = normalize_ticker(ticker)
+    available_dates = get_expiration_dates(ticker)
 
     if not available_dates:
         print(f"Нет доступных дат экспирации для {ticker}")
@@ -50,77 +488,602 @@ def get_option_data(ticker, expirations):
     if not expirations:
         expirations = [available_dates[0]]
 
-    all_options_data = []
+    # Порядок и повторы дат не влияют на результат
+    expirations = sorted(set(expirations))
 
-    for expiration in expirations:
-        try:
-            option_chain = stock.option_chain(expiration)
-            calls = option_chain.calls[['strike', 'openInterest', 'volume']].rename(
-                columns={'openInterest': 'Call OI', 'volume': 'Call Volume'})
-            puts = option_chain.puts[['strike', 'openInterest', 'volume']].rename(
-                columns={'openInterest': 'Put OI', 'volume': 'Put Volume'})
-
-            options_data = calls.merge(puts, on='strike', how='outer').sort_values(by='strike')
-            all_options_data.append(options_data)
-        except Exception as e:
-            print(f"Ошибка загрузки данных для {expiration}: {e}")
+    loaded = [(expiration, chain) for expiration, chain in zip(expirations, get_option_chains(ticker, expirations))
+              if chain is not None]
+    stage_checkpoint('fetch')
 
-    if not all_options_data:
+    if not loaded:
         print("Нет данных по опционам")
         return None, available_dates, None, None
 
-    combined_data = pd.concat(all_options_data).groupby("strike", as_index=False).sum()
-
-    if stock.history(period="1d").shape[0] > 0:
-        spot_price = stock.history(period="1d")['Close'].iloc[-1]
-    else:
-        spot_price = None
+    # Цену берем из снапшота, если она передана, иначе - один запрос дневной истории
+    if spot_price is None:
+        daily_hist = get_daily_bars(ticker, '1d')
+        spot_price = daily_hist['Close'].iloc[-1] if not daily_hist.empty else None
 
-    if spot_price:
-        combined_data['Net GEX'] = (
-                (combined_data['Call OI'] * spot_price / 100 * spot_price * 0.001)
-                - (combined_data['Put OI'] * spot_price / 100 * spot_price * 0.001)
-        ).round(1)
+    if not spot_price:
+        print(f"Нет текущей цены для {ticker}")
+        return None, available_dates, None, None
 
-    combined_data['AG'] = ((combined_data['Call OI'] * spot_price / 100 * spot_price * 0.005) +
-                           (combined_data['Put OI'] * spot_price / 100 * spot_price * 0.005)).round(1)
+    # При воспроизведении время до экспирации считается от момента истории
+    now = pd.Timestamp(replay_time(), unit='s', tz='UTC') if is_replay_mode() else None
+    combined_data = build_exposure_data([expiration for expiration, _ in loaded],
+                                        [chain for _, chain in loaded], spot_price, now)
 
-    max_ag_strike = combined_data.loc[combined_data['AG'].idxmax(), 'strike']
+    max_ag_strike = compute_key_levels(build_level_index(combined_data))['max_ag']
+    stage_checkpoint('pandas')
 
     return combined_data, available_dates, spot_price, max_ag_strike
 
 
-# Функция для расчета статических уровней
-def calculate_static_levels(options_data, spot_price):
+# Время жизни снапшота рынка в секундах (один "тик" обновления) по умолчанию
+SNAPSHOT_TTL = 60
+
+# Максимальный возраст снапшота (секунды), который еще отдается пользователю сразу,
+# пока новый снапшот собирается в фоне (stale-while-revalidate)
+SNAPSHOT_MAX_STALENESS = 600
+
+# Интервал обновления и максимальная устарелость для отдельных тикеров
+SNAPSHOT_REFRESH_CONFIG = {
+    '^SPX': {'refresh_interval': 30, 'max_staleness': 300},
+}
+
+
+# Проверка настроек: интервал обновления не длиннее запаса на сборку оставил бы цепочку тикера
+# без кэша (см. option_chain_ttl)
+def validate_snapshot_refresh_config():
+    for ticker, config in {'по умолчанию': {}, **SNAPSHOT_REFRESH_CONFIG}.items():
+        if config.get('refresh_interval', SNAPSHOT_TTL) <= OPTION_CHAIN_TTL_MARGIN:
+            raise ValueError(f"refresh_interval ({ticker}) должен быть больше "
+                             f"OPTION_CHAIN_TTL_MARGIN ({OPTION_CHAIN_TTL_MARGIN} с)")
+
+
+validate_snapshot_refresh_config()
+
+# Живое обновление графиков цены: открытая страница подписывается на поток SSE своего тикера
+# (live_stream) и получает событие на каждый новый снапшот. LIVE_UPDATE_SECONDS - как часто страница
+# проверяет новый снапшот сама, если поток недоступен (секунды, 0 - без живого обновления).
+# LIVE_MAX_STREAMS - сколько потоков SSE держит один процесс (0 - только проверка по интервалу).
+LIVE_UPDATE_SECONDS = float(os.environ.get('LIVE_UPDATE_SECONDS', 5))
+LIVE_MAX_STREAMS = int(os.environ.get('LIVE_MAX_STREAMS', 64))
+LIVE_STREAMS_ENABLED = LIVE_UPDATE_SECONDS > 0 and LIVE_MAX_STREAMS > 0
+
+# Неизменяемый снапшот рынка по тикеру. Все графики страницы читают из одного снапшота,
+# поэтому минутные бары, цена и цепочка опционов загружаются один раз на тик и цена везде совпадает.
+# bars и options_data внутри снапшота не изменяются - колбэки делают только выборки из них.
+MarketSnapshot = namedtuple('MarketSnapshot', [
+    'ticker',  # нормализованный тикер
+    'created_at',  # время сборки (time.time())
+    'bars',  # минутные бары за день с колонками CumulativeVolume / CumulativePV / VWAP
+    'spot_price',  # текущая цена (последний минутный Close)
+    'options_data',  # цепочка ближайшей экспирации с Net GEX и AG (или None)
+    'available_dates',  # доступные даты экспирации
+    'max_ag_strike',  # страйк с максимальным AG по всей цепочке
+    'stale',  # восстановлен с диска после перезапуска: показывается, но требует обновления
+], defaults=(False,))
+
+# Сколько хранится снапшот на диске для теплого перезапуска (секунды, с запасом на выходные).
+# Актуальность снапшота определяется по created_at, а не по сроку хранения в кэше.
+SNAPSHOT_PERSIST_TTL = 4 * 24 * 60 * 60
+
+# Блокировки на тикер: параллельные колбэки одного поиска ждут одну сборку снапшота
+_snapshot_locks = {}
+_snapshot_locks_guard = threading.Lock()
+
+
+def _get_snapshot_lock(ticker):
+    with _snapshot_locks_guard:
+        if ticker not in _snapshot_locks:
+            _snapshot_locks[ticker] = threading.Lock()
+        return _snapshot_locks[ticker]
+
+
+# Сколько хранится буфер минутных баров тикера (секунды)
+INTRADAY_BARS_TTL = 8 * 60 * 60
+
+
+# Функция добавления накопленных колонок к новым барам, продолжая суммы предыдущих баров
+def add_cumulative_columns(bars, base_volume=0.0, base_pv=0.0):
+    bars['CumulativeVolume'] = base_volume + bars['Volume'].cumsum()
+    bars['CumulativePV'] = base_pv + (bars['Volume'] * (bars['High'] + bars['Low'] + bars['Close']) / 3).cumsum()
+    bars['VWAP'] = bars['CumulativePV'] / bars['CumulativeVolume']
+    return bars
+
+
+# Функция полной загрузки минутных баров за день
+def load_intraday_bars(ticker):
+    bars = market_data.intraday_bars(ticker)
+    if bars.empty:
+        return bars
+    return add_cumulative_columns(bars)
+
+
+# Функция обновления буфера минутных баров: загружаются только бары начиная с последнего
+# сохраненного (он мог еще формироваться), накопленные суммы продолжаются с предыдущего бара.
+# Полная загрузка - только при пустом буфере или с началом новой торговой сессии.
+def update_intraday_bars(ticker):
+    ticker = normalize_ticker(ticker)
+    if is_replay_mode():
+        bars = snapshot_store.read_day_bars(ticker, replay_time())
+        return add_cumulative_columns(bars) if not bars.empty else bars
+
+    cache_key = f"bars:{ticker}"
+    bars = cache.get(cache_key)
+
+    try:
+        if bars is None or bars.empty:
+            bars = load_intraday_bars(ticker)
+            record_history(snapshot_store.write_bars, ticker, bars)
+        else:
+            last_timestamp = bars.index[-1]
+            new_bars = market_data.intraday_bars(ticker, start=last_timestamp)
+            new_bars = new_bars[new_bars.index >= last_timestamp]
+
+            if new_bars.empty:
+                return bars
+
+            record_history(snapshot_store.write_bars, ticker, new_bars)
+            if new_bars.index[-1].date() != last_timestamp.date():
+                bars = load_intraday_bars(ticker)
+            else:
+                # Бары до первого нового остаются как есть, их суммы - начальное состояние
+                position = bars.index.searchsorted(new_bars.index[0])
+                if position > 0:
+                    base_volume = bars['CumulativeVolume'].iat[position - 1]
+                    base_pv = bars['CumulativePV'].iat[position - 1]
+                else:
+                    base_volume = base_pv = 0.0
+                new_bars = add_cumulative_columns(new_bars[['Open', 'High', 'Low', 'Close', 'Volume']].copy(),
+                                                  base_volume, base_pv)
+                bars = pd.concat([bars.iloc[:position], new_bars])
+    except Exception as e:
+        print(f"Ошибка загрузки минутных данных {ticker}: {e}")
+        return bars if bars is not None else pd.DataFrame()
+
+    if not bars.empty:
+        cache.set(cache_key, bars, timeout=INTRADAY_BARS_TTL)
+    return bars
+
+
+# Функция сборки снапшота: одно обновление минутных баров и один запрос цепочки опционов
+def build_market_snapshot(ticker):
+    ticker = normalize_ticker(ticker)
+    bars = update_intraday_bars(ticker)
+
+    spot_price = None
+    if not bars.empty:
+        spot_price = bars['Close'].iloc[-1]
+
+    options_data, available_dates, spot_price, max_ag_strike = get_option_data(ticker, [], spot_price)
+    if spot_price is None and not bars.empty:
+        spot_price = bars['Close'].iloc[-1]
+
+    return MarketSnapshot(
+        ticker=ticker,
+        created_at=time.time(),
+        bars=bars,
+        spot_price=spot_price,
+        options_data=options_data,
+        available_dates=available_dates,
+        max_ag_strike=max_ag_strike,
+    )
+
+
+# Функция получения настроек обновления снапшота для тикера
+def get_snapshot_refresh_config(ticker):
+    config = SNAPSHOT_REFRESH_CONFIG.get(normalize_ticker(ticker), {})
+    return (config.get('refresh_interval', SNAPSHOT_TTL),
+            config.get('max_staleness', SNAPSHOT_MAX_STALENESS))
+
+
+# Снапшот пригоден к показу, если в нем есть хотя бы бары или цепочка опционов
+def is_usable_snapshot(snapshot):
+    return not snapshot.bars.empty or snapshot.options_data is not None
+
+
+# Функция пересборки снапшота. Неудачная загрузка не затирает последний хороший снапшот.
+# force=True (плановое обновление) пересобирает снапшот, даже если он моложе refresh_interval:
+# created_at ставится в конце сборки, и к следующему запуску по расписанию снапшот всегда чуть моложе
+# интервала - без force каждый второй запуск пропускался бы.
+def refresh_market_snapshot(ticker, force=False):
+    ticker = normalize_ticker(ticker)
+    cache_key = f"snapshot:{ticker}"
+    refresh_interval, _ = get_snapshot_refresh_config(ticker)
+    requested_at = time.time()
+
+    with _get_snapshot_lock(ticker):
+        # Пока ждали блокировку, снапшот мог собрать другой поток или другой воркер,
+        # поэтому снапшот перечитывается из общего кэша мимо L1
+        try:
+            snapshot = cache.cache.reload(cache_key)
+            if snapshot is not None and not snapshot.stale and (
+                    snapshot.created_at >= requested_at
+                    or (not force and time.time() - snapshot.created_at < refresh_interval)):
+                return snapshot
+
+            def rebuild():
+                fresh_snapshot = build_market_snapshot(ticker)
+                if snapshot is not None and not is_usable_snapshot(fresh_snapshot):
+                    print(f"Не удалось обновить снапшот {ticker}, используется предыдущий")
+                    return snapshot
+
+                cache.set(cache_key, fresh_snapshot, timeout=SNAPSHOT_PERSIST_TTL)
+                return fresh_snapshot
+
+            # Если снапшот уже собирает другой воркер - ждем его снапшот, новее текущего
+            def lookup():
+                rebuilt = cache.cache.reload(cache_key)
+                if rebuilt is not None and not rebuilt.stale and (
+                        snapshot is None or rebuilt.created_at > snapshot.created_at):
+                    return rebuilt
+                return None
+
+            return single_flight(cache_key, rebuild, lookup)
+        finally:
+            mark_ticker_warmed(ticker)
+
+
+# Фоновые обновления снапшотов, запрошенные пользователями (не более одного на тикер)
+_snapshot_refresh_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='snapshot-refresh')
+_refreshing_tickers = set()
+_refreshing_tickers_guard = threading.Lock()
+
+
+def _refresh_market_snapshot_in_background(ticker):
+    try:
+        refresh_market_snapshot(ticker)
+    except Exception as e:
+        print(f"Ошибка фонового обновления снапшота {ticker}: {e}")
+    finally:
+        with _refreshing_tickers_guard:
+            _refreshing_tickers.discard(ticker)
+
+
+def schedule_snapshot_refresh(ticker):
+    with _refreshing_tickers_guard:
+        if ticker in _refreshing_tickers:
+            return
+        _refreshing_tickers.add(ticker)
+    _snapshot_refresh_executor.submit(_refresh_market_snapshot_in_background, ticker)
+
+
+# Функция получения снапшота: общий для всех колбэков.
+# Свежий снапшот отдается как есть, устаревший - сразу, но с запуском фонового обновления,
+# и только при отсутствии снапшота (или слишком старом) колбэк ждет загрузку.
+def get_market_snapshot(ticker):
+    ticker = normalize_ticker(ticker)
+    refresh_interval, max_staleness = get_snapshot_refresh_config(ticker)
+
+    snapshot = cache.get(f"snapshot:{ticker}")
+    if snapshot is not None:
+        age = time.time() - snapshot.created_at
+        if age < refresh_interval and not snapshot.stale:
+            return record_useful_response(snapshot)
+        # Восстановленный после перезапуска снапшот отдается при любом возрасте
+        if age < max_staleness or snapshot.stale:
+            schedule_snapshot_refresh(ticker)
+            return record_useful_response(snapshot)
+
+    return record_useful_response(refresh_market_snapshot(ticker))
+
+
+# Хаб живых обновлений: один поллер на тикер с открытыми страницами (см. live_hub.py)
+live_hub = LiveHub(refresh_market_snapshot, lambda ticker: get_snapshot_refresh_config(ticker)[0])
+
+# Поток SSE без событий получает комментарий раз в LIVE_HEARTBEAT_SECONDS (прокси не закрывают соединение
+# и закрытая вкладка обнаруживается при записи); после обрыва браузер переподключается через LIVE_RETRY_MS
+LIVE_HEARTBEAT_SECONDS = 15
+LIVE_RETRY_MS = 3000
+
+_live_streams = {'open': 0}
+_live_streams_guard = threading.Lock()
+
+
+def _release_live_stream():
+    with _live_streams_guard:
+        _live_streams['open'] -= 1
+
+
+# Поток SSE живых обновлений тикера: событие snapshot (тикер, created_at, цена) на каждый новый снапшот.
+# Соединение занимает поток воркера, поэтому потоков SSE в процессе не больше LIVE_MAX_STREAMS;
+# сверх них - 503, и страница проверяет новые снапшоты по интервалу
+@app.server.route('/live/<ticker>')
+def live_stream(ticker):
+    ticker = normalize_ticker(ticker)
+    with _live_streams_guard:
+        if not LIVE_STREAMS_ENABLED or _live_streams['open'] >= LIVE_MAX_STREAMS:
+            return Response("Нет свободных потоков живых обновлений", status=503)
+        _live_streams['open'] += 1
+
+    def stream():
+        events = live_hub.subscribe(ticker)
+        try:
+            yield f"retry: {LIVE_RETRY_MS}\n\n"
+            while True:
+                try:
+                    snapshot = events.get(timeout=LIVE_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield ": heartbeat\n\n"
+                    continue
+                event = {'ticker': snapshot.ticker, 'created_at': snapshot.created_at,
+                         'spot_price': float(snapshot.spot_price) if snapshot.spot_price is not None else None}
+                yield f"event: snapshot\ndata: {json.dumps(event)}\n\n"
+        finally:
+            live_hub.unsubscribe(ticker, events)
+
+    response = Response(stream(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.call_on_close(_release_live_stream)
+    return response
+
+
+# Состояние прогрева после старта: восстановленные и отброшенные записи кэша,
+# тикеры прогрева, по которым уже прошло обновление, и замеры времени от BOOT_TIME
+_warm_state = {
+    'restored': [],
+    'discarded': [],
+    'pending': set(),
+    'restore_seconds': None,
+    'ready_at': None,
+    'first_useful_response_at': None,
+}
+_warm_state_guard = threading.Lock()
+
+# Колонки, без которых восстановленные минутные бары и цепочка не годятся для графиков
+INTRADAY_BARS_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'CumulativeVolume', 'CumulativePV', 'VWAP']
+
+
+def _mark_ready_if_warmed():
+    if _warm_state['ready_at'] is None and _warm_state['restore_seconds'] is not None \
+            and not _warm_state['pending']:
+        _warm_state['ready_at'] = time.time()
+        print(f"Прогрев завершен за {_warm_state['ready_at'] - BOOT_TIME:.2f} с после старта")
+
+
+# Отметка о том, что по тикеру прошло обновление снапшота (удачное или нет)
+def mark_ticker_warmed(ticker):
+    with _warm_state_guard:
+        if ticker in _warm_state['pending']:
+            _warm_state['pending'].discard(ticker)
+            _mark_ready_if_warmed()
+
+
+# Замер первого ответа пользователю с пригодным снапшотом после старта
+def record_useful_response(snapshot):
+    if _warm_state['first_useful_response_at'] is None and snapshot is not None and is_usable_snapshot(snapshot):
+        with _warm_state_guard:
+            if _warm_state['first_useful_response_at'] is None:
+                _warm_state['first_useful_response_at'] = time.time()
+                print(f"Первый полезный ответ через {_warm_state['first_useful_response_at'] - BOOT_TIME:.2f} с "
+                      f"после старта ({'восстановленный' if snapshot.stale else 'свежий'} снапшот {snapshot.ticker})")
+    return snapshot
+
+
+def is_valid_intraday_bars(bars):
+    return (isinstance(bars, pd.DataFrame)
+            and isinstance(bars.index, pd.DatetimeIndex)
+            and (bars.empty or all(column in bars.columns for column in INTRADAY_BARS_COLUMNS)))
+
+
+# Проверка снапшота, сохраненного прошлым запуском (возможно, другой версией кода)
+def is_valid_persisted_snapshot(snapshot, ticker, now):
+    if not isinstance(snapshot, MarketSnapshot) or snapshot.ticker != ticker:
+        return False
+    if not isinstance(snapshot.created_at, (int, float)) or not now - SNAPSHOT_PERSIST_TTL < snapshot.created_at <= now:
+        return False
+    if not is_valid_intraday_bars(snapshot.bars):
+        return False
+    if snapshot.options_data is not None and not (
+            isinstance(snapshot.options_data, pd.DataFrame)
+            and all(column in snapshot.options_data.columns for column in ['strike'] + OPTION_DATA_COLUMNS)):
+        return False
+    return is_usable_snapshot(snapshot)
+
+
+# Чтение записи кэша прошлого запуска: нечитаемая (класс переименован, файл поврежден) удаляется
+def _load_persisted(cache_key):
+    try:
+        return cache.get(cache_key)
+    except Exception as e:
+        print(f"Не удалось прочитать {cache_key} из кэша: {e}")
+        cache.delete(cache_key)
+        return None
+
+
+# Теплый старт: снапшоты и буферы минутных баров прошлого запуска проверяются и возвращаются
+# в кэш с пометкой stale. Колбэки сразу отдают их, а первое обращение или прогрев их обновляет.
+def warm_start(tickers):
+    started_at = time.time()
+    tickers = list(dict.fromkeys(normalize_ticker(ticker) for ticker in tickers))
+
+    for ticker in tickers:
+        bars_key = f"bars:{ticker}"
+        bars = _load_persisted(bars_key)
+        if bars is not None and not is_valid_intraday_bars(bars):
+            cache.delete(bars_key)
+            _warm_state['discarded'].append(bars_key)
+
+        snapshot_key = f"snapshot:{ticker}"
+        snapshot = _load_persisted(snapshot_key)
+        if snapshot is None:
+            continue
+        if not is_valid_persisted_snapshot(snapshot, ticker, started_at):
+            cache.delete(snapshot_key)
+            _warm_state['discarded'].append(snapshot_key)
+            continue
+        _warm_state['restored'].append(ticker)
+        # Свежий снапшот в общем кэше собран работающим воркером (перезапущен только этот воркер):
+        # он не помечается устаревшим, иначе обновлять его кинулись бы все воркеры
+        if not snapshot.stale and started_at - snapshot.created_at < get_snapshot_refresh_config(ticker)[0]:
+            mark_ticker_warmed(ticker)
+            continue
+        cache.set(snapshot_key, snapshot._replace(stale=True), timeout=SNAPSHOT_PERSIST_TTL)
+
+    with _warm_state_guard:
+        _warm_state['restore_seconds'] = time.time() - started_at
+        _mark_ready_if_warmed()
+    print(f"Теплый старт: восстановлено снапшотов {len(_warm_state['restored'])}/{len(tickers)}, "
+          f"отброшено записей {len(_warm_state['discarded'])} за {_warm_state['restore_seconds']:.3f} с")
+
+
+# Готовность: прогрев завершен, когда по всем тикерам прогрева прошло обновление
+# (без фонового прогрева - сразу после восстановления кэша). До этого ответ 503.
+def _seconds_since_boot(moment):
+    return round(moment - BOOT_TIME, 3) if moment is not None else None
+
+
+# Тикеры, обновленные другим воркером (прогрев идет только в одном процессе), тоже считаются
+# прогретыми: в общем кэше для них лежит собранный, а не восстановленный снапшот.
+# Снапшот читается мимо L1: там до обновления лежит восстановленная этим воркером копия.
+def _sync_warm_state_from_cache():
+    for ticker in list(_warm_state['pending']):
+        snapshot = cache.cache.reload(f"snapshot:{ticker}")
+        if snapshot is not None and not snapshot.stale:
+            mark_ticker_warmed(ticker)
+
+
+@app.server.route('/ready')
+def readiness():
+    if _warm_state['ready_at'] is None and _warm_state['restore_seconds'] is not None:
+        _sync_warm_state_from_cache()
+    with _warm_state_guard:
+        ready = _warm_state['ready_at'] is not None
+        status = {
+            'ready': ready,
+            'warm_restart': WARM_RESTART_ENABLED,
+            'uptime_seconds': round(time.time() - BOOT_TIME, 3),
+            'restored_snapshots': len(_warm_state['restored']),
+            'discarded_entries': len(_warm_state['discarded']),
+            'pending_tickers': sorted(_warm_state['pending']),
+            'restore_seconds': round(_warm_state['restore_seconds'], 3) if _warm_state['restore_seconds'] is not None else None,
+            'ready_after_seconds': _seconds_since_boot(_warm_state['ready_at']),
+            'first_useful_response_seconds': _seconds_since_boot(_warm_state['first_useful_response_at']),
+        }
+    return jsonify(status), 200 if ready else 503
+
+
+# Ключевые уровни снапшота (см. key_levels.py). Матрица метрик строится один раз на снапшот,
+# уровни - один раз на окно страйков: все графики и пользователи одного снапшота получают
+# готовый результат. Ключ - (тикер, created_at снапшота, окно, цена); результат не изменяется.
+KEY_LEVELS_CACHE_SIZE = 512
+
+_level_indexes = {}  # тикер -> (created_at, LevelIndex) последнего снапшота
+_key_levels_cache = OrderedDict()
+_key_levels_guard = threading.Lock()
+
+
+def _get_level_index(snapshot):
+    with _key_levels_guard:
+        cached = _level_indexes.get(snapshot.ticker)
+    if cached is not None and cached[0] == snapshot.created_at:
+        return cached[1]
+    index = build_level_index(snapshot.options_data)
+    with _key_levels_guard:
+        _level_indexes[snapshot.ticker] = (snapshot.created_at, index)
+    return index
+
+
+# Функция получения ключевых уровней снапшота в окне страйков [lower, upper]
+def get_key_levels(snapshot, lower=None, upper=None, spot=None):
+    key = (snapshot.ticker, snapshot.created_at, lower, upper, spot)
+    with _key_levels_guard:
+        levels = _key_levels_cache.get(key)
+        if levels is not None:
+            _key_levels_cache.move_to_end(key)
+            return levels
+
+    levels = compute_key_levels(_get_level_index(snapshot), lower, upper, spot)
+    with _key_levels_guard:
+        _key_levels_cache[key] = levels
+        if len(_key_levels_cache) > KEY_LEVELS_CACHE_SIZE:
+            _key_levels_cache.popitem(last=False)
+    return levels
+
+
+# Окно страйков [lower, upper] снапшота: (start, stop) - позиции строк options_data (двоичный поиск
+# по отсортированным страйкам). options_data.iloc[start:stop] - окно без булевых масок по цепочке.
+def get_strike_window(snapshot, lower=None, upper=None):
+    return window_bounds(_get_level_index(snapshot).strikes, lower, upper)
+
+
+# Суммы Call/Put Volume, Call/Put OI, Net GEX и AG по окну страйков снапшота (префиксные суммы)
+def get_window_sums(snapshot, lower=None, upper=None):
+    return window_sums(_get_level_index(snapshot), lower, upper)
+
+
+# G-Flip: смена знака Net GEX и G_FLIP_RUN_LENGTH страйков подряд с новым знаком после нее.
+# Зоны обоих направлений ищутся один раз на снапшот по всей цепочке, страницы выбирают первую
+# зону в своем окне страйков (прогноз - 'down', ключевые уровни - 'up')
+G_FLIP_RUN_LENGTH = int(os.environ.get('G_FLIP_RUN_LENGTH', 6))
+
+
+# Функция получения первой зоны G-Flip снапшота в окне [lower, upper]: (страйк, страйк нуля Net GEX)
+def get_gamma_flip(snapshot, direction, lower=None, upper=None, run_length=G_FLIP_RUN_LENGTH):
+    index = _get_level_index(snapshot)
+    key = (snapshot.ticker, snapshot.created_at, 'gamma_flips', run_length)
+    with _key_levels_guard:
+        flips = _key_levels_cache.get(key)
+    if flips is None:
+        flips = {name: find_gamma_flips(index, run_length, name) for name in ('up', 'down')}
+        with _key_levels_guard:
+            _key_levels_cache[key] = flips
+            if len(_key_levels_cache) > KEY_LEVELS_CACHE_SIZE:
+                _key_levels_cache.popitem(last=False)
+    return first_gamma_flip(index, flips[direction], lower, upper)
+
+
+# Цены в фигурах округляются до тика: лишние знаки float64 только раздувают ответ
+PRICE_DECIMALS = 2
+
+
+# Функция уменьшения JSON фигуры ценового графика перед отправкой: массивы по барам
+# (свечи, VWAP) уходят округленными до тика списками, а время баров - строками без зоны.
+# Plotly.js все равно показывает время как записано, без учета смещения зоны, поэтому
+# 'YYYY-MM-DD HH:MM' рисуется там же, где ISO-время с зоной, но в 2 раза короче.
+# Списки, а не base64 (bdata): округленные цены повторяются и сжимаются gzip/brotli лучше
+def compact_figure(fig):
+    for trace in fig.data:
+        for name in ('open', 'high', 'low', 'close', 'y'):
+            values = trace[name] if name in trace else None
+            if isinstance(values, np.ndarray) and values.dtype.kind == 'f':
+                trace[name] = np.round(values, PRICE_DECIMALS).tolist()
+        values = trace['x'] if 'x' in trace else None
+        if isinstance(values, np.ndarray) and len(values) and (
+                values.dtype.kind == 'M' or isinstance(values[0], datetime)):
+            times = pd.DatetimeIndex(values)
+            if times.tz is not None:
+                times = times.tz_localize(None)
+            with_seconds = (times.second != 0).any() or (times.microsecond != 0).any()
+            trace['x'] = times.strftime('%Y-%m-%d %H:%M:%S' if with_seconds else '%Y-%m-%d %H:%M').tolist()
+    return fig
+
+
+# Функция для расчета статических уровней по уровням выше и ниже текущей цены (get_key_levels с spot)
+def calculate_static_levels(levels):
     # Уровни сопротивления
     resistance_levels = []
 
     # Максимальные значения AG выше текущей цены
-    ag_above_spot = options_data[options_data['strike'] > spot_price]
-    if not ag_above_spot.empty:
-        max_ag_strike = ag_above_spot.loc[ag_above_spot['AG'].idxmax(), 'strike']
-        resistance_levels.append(('AG', max_ag_strike))
+    if levels['above']['max_ag'] is not None:
+        resistance_levels.append(('AG', levels['above']['max_ag']))
 
     # Максимальные положительные значения Net GEX выше текущей цены
-    net_gex_above_spot = options_data[(options_data['strike'] > spot_price) & (options_data['Net GEX'] > 0)]
-    if not net_gex_above_spot.empty:
-        max_net_gex_strike = net_gex_above_spot.loc[net_gex_above_spot['Net GEX'].idxmax(), 'strike']
-        resistance_levels.append(('Net GEX', max_net_gex_strike))
+    if levels['above']['positive_net_gex'] is not None:
+        resistance_levels.append(('Net GEX', levels['above']['positive_net_gex']))
 
     # Уровни поддержки
     support_levels = []
 
     # Максимальные значения AG ниже текущей цены
-    ag_below_spot = options_data[options_data['strike'] < spot_price]
-    if not ag_below_spot.empty:
-        max_ag_strike = ag_below_spot.loc[ag_below_spot['AG'].idxmax(), 'strike']
-        support_levels.append(('AG', max_ag_strike))
+    if levels['below']['max_ag'] is not None:
+        support_levels.append(('AG', levels['below']['max_ag']))
 
     # Максимальные отрицательные значения Net GEX ниже текущей цены
-    net_gex_below_spot = options_data[(options_data['strike'] < spot_price) & (options_data['Net GEX'] < 0)]
-    if not net_gex_below_spot.empty:
-        max_net_gex_strike = net_gex_below_spot.loc[net_gex_below_spot['Net GEX'].idxmin(), 'strike']
-        support_levels.append(('Net GEX', max_net_gex_strike))
+    if levels['below']['negative_net_gex'] is not None:
+        support_levels.append(('Net GEX', levels['below']['negative_net_gex']))
 
     # Объединение уровней, если они находятся близко друг к другу (в пределах 20 пунктов)
     def merge_levels(levels):
@@ -255,7 +1218,9 @@ options_summary_page = html.Div(
             ),
             style={'margin-bottom': '20px'}
         ),
-        dcc.Location(id='summary-url', refresh=False)
+        dcc.Location(id='summary-url', refresh=False),
+        # Периодическое обновление: медленные тикеры появляются в таблице по мере загрузки
+        dcc.Interval(id='summary-interval', interval=15 * 1000, n_intervals=0)
     ],
     style={
         'margin-left': '10%',
@@ -648,6 +1613,8 @@ index_page = html.Div([
 
     dcc.Store(id='selected-params', data=['Net GEX']),
     dcc.Store(id='options-data-store'),
+    # Оформление plotly по умолчанию для графика опционов, который строится в браузере
+    dcc.Store(id='options-chart-template', data=pio.templates[pio.templates.default].to_plotly_json()),
 
     dcc.Graph(
         id='options-chart',
@@ -664,6 +1631,14 @@ index_page = html.Div([
         }
     ),
 
+    # Живое обновление ценовых графиков (см. live_chart_update): события потока SSE,
+    # проверка по интервалу (без потока) и состояние графиков в браузере
+    dcc.Store(id='live-snapshot'),
+    dcc.Interval(id='live-interval', interval=max(LIVE_UPDATE_SECONDS, 1) * 1000,
+                 disabled=not LIVE_UPDATE_SECONDS or LIVE_STREAMS_ENABLED),
+    dcc.Store(id='price-chart-live'),
+    dcc.Store(id='price-chart-simplified-live'),
+
     dcc.Graph(
         id='price-chart',
         style={'height': '950px', 'border-radius': '12px',
@@ -706,6 +1681,11 @@ key_levels_page = html.Div(
             html.Button('Поиск', id='search-button-key-levels', n_clicks=0, className='dash-button', style={'margin-left': '10px'}),
         ], className='dash-container', style={'display': 'flex', 'align-items': 'center'}),
 
+        dcc.Store(id='live-snapshot-key-levels'),
+        dcc.Interval(id='live-interval-key-levels', interval=max(LIVE_UPDATE_SECONDS, 1) * 1000,
+                     disabled=not LIVE_UPDATE_SECONDS or LIVE_STREAMS_ENABLED),
+        dcc.Store(id='key-levels-chart-live'),
+
         html.Div(
             dcc.Graph(
                 id='key-levels-chart',
@@ -756,19 +1736,18 @@ def update_forecast(n_clicks, n_submit, ticker):
         ticker = 'SPX'
 
     ticker = normalize_ticker(ticker)
-    stock = yf.Ticker(ticker)
+    snapshot = get_market_snapshot(ticker)
 
     # Получаем данные по ценам
     try:
-        hist = stock.history(period='3mo', interval='1d')
-        intraday_hist = stock.history(period='1d', interval='1m')
+        hist = get_daily_bars(ticker, '3mo')
+        stage_checkpoint('fetch')
+        intraday_hist = snapshot.bars
         if hist.empty or intraday_hist.empty:
             return html.Div("Нет данных для анализа", style={'color': 'white'})
 
-        current_price = intraday_hist['Close'].iloc[-1]
-        vwap = (intraday_hist['Volume'] * (
-                intraday_hist['High'] + intraday_hist['Low'] + intraday_hist['Close']) / 3).sum() / intraday_hist[
-                   'Volume'].sum()
+        current_price = snapshot.spot_price
+        vwap = intraday_hist['VWAP'].iloc[-1]
         current_volume = intraday_hist['Volume'].iloc[-1]
         avg_volume = intraday_hist['Volume'].mean()
     except Exception as e:
@@ -789,7 +1768,7 @@ def update_forecast(n_clicks, n_submit, ticker):
     current_rsi = rsi.iloc[-1]
 
     # Получаем данные по опционам
-    options_data, _, spot_price, _ = get_option_data(ticker, [])
+    options_data = snapshot.options_data
     if options_data is None or options_data.empty:
         return html.Div("Нет данных по опционам для анализа", style={'color': 'white'})
 
@@ -797,54 +1776,58 @@ def update_forecast(n_clicks, n_submit, ticker):
     price_range = 0.02 if ticker in ["^SPX", "^NDX", "^RUT", "^DJI"] else 0.05
     lower_limit = current_price * (1 - price_range)
     upper_limit = current_price * (1 + price_range)
-    filtered_data = options_data[(options_data['strike'] >= lower_limit) & (options_data['strike'] <= upper_limit)]
+    window_totals = get_window_sums(snapshot, lower_limit, upper_limit)
 
-    if filtered_data.empty:
+    if not window_totals['strikes']:
         return html.Div("Недостаточно данных в ценовом диапазоне", style={'color': 'white'})
 
     # Ключевые уровни
-    max_call_vol_strike = filtered_data.loc[filtered_data['Call Volume'].idxmax(), 'strike']
-    max_put_vol_strike = filtered_data.loc[filtered_data['Put Volume'].idxmax(), 'strike']
-    max_neg_gex_strike = filtered_data.loc[filtered_data['Net GEX'].idxmin(), 'strike']
-    max_pos_gex_strike = filtered_data.loc[filtered_data['Net GEX'].idxmax(), 'strike']
-    max_ag_strike = filtered_data.loc[filtered_data['AG'].idxmax(), 'strike']
-    max_call_oi_strike = filtered_data.loc[filtered_data['Call OI'].idxmax(), 'strike']
-    max_put_oi_strike = filtered_data.loc[filtered_data['Put OI'].idxmax(), 'strike']
-
-    # Находим G-Flip зону
-    g_flip_zone = None
-    gex_values = filtered_data['Net GEX'].values
-    for i in range(len(gex_values) - 6):
-        if gex_values[i] > 0 and all(gex_values[i + j] < 0 for j in range(1, 7)):
-            g_flip_zone = filtered_data.iloc[i]['strike']
-            break
-
-    # Рассчитываем P/C Ratio и объемы
-    total_call_oi = options_data['Call OI'].sum()
-    total_put_oi = options_data['Put OI'].sum()
+    levels = get_key_levels(snapshot, lower_limit, upper_limit)
+    max_call_vol_strike = levels['max_call_volume']
+    max_put_vol_strike = levels['max_put_volume']
+    max_neg_gex_strike = levels['min_net_gex']
+    max_pos_gex_strike = levels['max_net_gex']
+    max_ag_strike = levels['max_ag']
+    max_call_oi_strike = levels['max_call_oi']
+    max_put_oi_strike = levels['max_put_oi']
+
+    # Находим G-Flip зону (положительный Net GEX, затем отрицательный)
+    g_flip_zone, _ = get_gamma_flip(snapshot, 'down', lower_limit, upper_limit)
+
+    # Рассчитываем P/C Ratio (по всей цепочке) и объемы (по окну)
+    chain_totals = get_window_sums(snapshot)
+    total_call_oi = chain_totals['Call OI']
+    total_put_oi = chain_totals['Put OI']
     pc_ratio = total_put_oi / total_call_oi if total_call_oi > 0 else float('inf')
 
-    call_volume = filtered_data['Call Volume'].sum()
-    put_volume = filtered_data['Put Volume'].sum()
+    call_volume = window_totals['Call Volume']
+    put_volume = window_totals['Put Volume']
     volume_ratio = put_volume / call_volume if call_volume > 0 else float('inf')
 
     # Статус Net GEX
-    net_gex_status = "положительный" if filtered_data['Net GEX'].sum() > 0 else "отрицательный"
+    window_net_gex = window_totals['Net GEX']
+    net_gex_status = "положительный" if window_net_gex > 0 else "отрицательный"
 
     # Проверяем рыночный фон
     bullish_background = bearish_background = False
     if current_price:
-        strikes_below = filtered_data[filtered_data['strike'] < current_price].sort_values('strike', ascending=False)
-        strikes_above = filtered_data[filtered_data['strike'] > current_price].sort_values('strike')
+        # По 3 ближайших к цене страйка окна ниже и выше нее
+        start, stop = get_strike_window(snapshot, lower_limit, upper_limit)
+        below_stop, above_start = get_strike_window(snapshot, current_price, current_price)
+        below_stop = min(below_stop, stop)
+        above_start = max(above_start, start)
+        net_gex = options_data['Net GEX'].to_numpy()
+        strikes_below = net_gex[max(start, below_stop - 3):below_stop]
+        strikes_above = net_gex[above_start:min(stop, above_start + 3)]
 
         # Бычий фон (положительный GEX вокруг цены)
-        pos_gex_below = sum(strikes_below['Net GEX'].head(3) > 0)
-        pos_gex_above = sum(strikes_above['Net GEX'].head(3) > 0)
+        pos_gex_below = sum(strikes_below > 0)
+        pos_gex_above = sum(strikes_above > 0)
         bullish_background = pos_gex_below >= 3 and pos_gex_above >= 3
 
         # Медвежий фон (отрицательный GEX вокруг цены)
-        neg_gex_below = sum(strikes_below['Net GEX'].head(3) < 0)
-        neg_gex_above = sum(strikes_above['Net GEX'].head(3) < 0)
+        neg_gex_below = sum(strikes_below < 0)
+        neg_gex_above = sum(strikes_above < 0)
         bearish_background = neg_gex_below >= 3 and neg_gex_above >= 3
 
     # Функция для расчета вероятности отскока/пробоя
@@ -896,6 +1879,7 @@ def update_forecast(n_clicks, n_submit, ticker):
         return probability, factors
 
     # Формируем прогноз
+    stage_checkpoint('pandas')
     forecast = []
 
     # 1. Основные данные (обновленный заголовок)
@@ -932,8 +1916,8 @@ def update_forecast(n_clicks, n_submit, ticker):
 
             html.Div([
                 html.P("Net GEX:", style={'color': 'white'}),
-                html.P(f"{filtered_data['Net GEX'].sum():,.0f}",
-                       style={'color': 'green' if filtered_data['Net GEX'].sum() > 0 else 'red',
+                html.P(f"{window_net_gex:,.0f}",
+                       style={'color': 'green' if window_net_gex > 0 else 'red',
                               'font-weight': 'bold'})
             ], style={'display': 'flex', 'justify-content': 'space-between'}),
         ], style={
@@ -1271,6 +2255,7 @@ def update_forecast(n_clicks, n_submit, ticker):
 
     forecast.extend(insights)
 
+    stage_checkpoint('figure')
     return html.Div(forecast,
                     style={'color': 'white', 'padding': '20px', 'background-color': '#1e1e1e', 'border-radius': '10px'})
 
@@ -1338,7 +2323,7 @@ def update_dates(n_clicks, n_submit, ticker):
         ticker = 'SPX'  # Устанавливаем SPX по умолчанию
 
     ticker = normalize_ticker(ticker)
-    _, available_dates, _, _ = get_option_data(ticker, [])
+    available_dates = get_market_snapshot(ticker).available_dates
     if not available_dates:
         return [], []
     options = [{'label': date, 'value': date} for date in available_dates]
@@ -1399,207 +2384,89 @@ def update_selected_params(btn_net, btn_ag, btn_call_oi, btn_put_oi, btn_call_vo
         button_classes["btn-put-oi"], button_classes["btn-call-vol"], button_classes["btn-put-vol"]
 
 
-# Callback для обновления графика опционов (возвращаем оригинальную версию)
+# Оригинальные параметры диапазона страйков графика опционов (доля от цены)
+def get_options_chart_price_range(ticker):
+    if ticker in ["^SPX", "^NDX", "^RUT", "^Dia"]:
+        return 0.017
+    elif ticker in ["SPY", "QQQ", "DIA", "XSP", "IWM"]:
+        return 0.03
+    elif ticker in ["^VIX"]:
+        return 0.5
+    return 0.12
+
+
+# Цепочка графика опционов для браузера: график строится клиентским колбэком (assets/options_chart.js)
+# по options-data-store, сервер только отдает данные. Колонки - списки значений по страйкам,
+# price_range - диапазон страйков вокруг цены, который показывает график.
+OPTIONS_CHART_PAYLOAD_COLUMNS = ['strike', 'Call OI', 'Call Volume', 'Put OI', 'Put Volume', 'Net GEX', 'AG']
+
+# Данные кэшируются на снапшот: повторный выбор тех же дат не пересчитывает GEX по цепочкам
+OPTIONS_CHART_PAYLOAD_CACHE_SIZE = 64
+
+_options_chart_payloads = OrderedDict()
+_options_chart_payloads_guard = threading.Lock()
+
+
+# Функция сборки данных графика опционов для тикера и дат (None - данных нет)
+def get_options_chart_payload(ticker, dates, snapshot):
+    key = (ticker, snapshot.created_at, tuple(sorted(set(dates))))
+    with _options_chart_payloads_guard:
+        payload = _options_chart_payloads.get(key)
+        if payload is not None:
+            _options_chart_payloads.move_to_end(key)
+            return payload
+
+    options_data, _, spot_price, _ = get_option_data(ticker, dates, snapshot.spot_price)
+    stage_checkpoint('fetch')
+    if options_data is None or options_data.empty:
+        return None
+
+    payload = {
+        'ticker': ticker,
+        'spot_price': float(spot_price) if spot_price else None,
+        'price_range': get_options_chart_price_range(ticker),
+        **{column: options_data[column].tolist() for column in OPTIONS_CHART_PAYLOAD_COLUMNS},
+    }
+    stage_checkpoint('pandas')
+
+    with _options_chart_payloads_guard:
+        _options_chart_payloads[key] = payload
+        if len(_options_chart_payloads) > OPTIONS_CHART_PAYLOAD_CACHE_SIZE:
+            _options_chart_payloads.popitem(last=False)
+    return payload
+
+
+# Callback загрузки данных графика опционов: только при поиске и смене дат,
+# переключение параметров перерисовывает график в браузере без запроса к серверу
 @app.callback(
-    Output('options-chart', 'figure'),
+    Output('options-data-store', 'data'),
     [Input('search-button', 'n_clicks'),
      Input('ticker-input', 'n_submit'),
-     Input('date-dropdown', 'value'),
-     Input('selected-params', 'data')],
+     Input('date-dropdown', 'value')],
     [State('ticker-input', 'value')]
 )
-def update_options_chart(n_clicks, n_submit, dates, selected_params, ticker):
+def update_options_data_store(n_clicks, n_submit, dates, ticker):
     ctx = dash.callback_context
-    if not ctx.triggered or not dates or not selected_params:
-        return go.Figure()
+    if not ctx.triggered or not dates:
+        return None
 
     ticker = normalize_ticker(ticker)
-    options_data, _, spot_price, max_ag_strike = get_option_data(ticker, dates)
-    if options_data is None or options_data.empty:
-        return go.Figure()
-
-    fig = go.Figure()
-
-    # Оригинальные параметры диапазона
-    if ticker in ["^SPX", "^NDX", "^RUT", "^Dia"]:
-        price_range = 0.017
-    elif ticker in ["SPY", "QQQ", "DIA", "XSP", "IWM"]:
-        price_range = 0.03
-    elif ticker in ["^VIX"]:
-        price_range = 0.5
-    else:
-        price_range = 0.12
-
-    if spot_price:
-        left_limit = spot_price - (spot_price * price_range)
-        right_limit = spot_price + (spot_price * price_range)
-        options_data = options_data[
-            (options_data['strike'] >= left_limit) & (options_data['strike'] <= right_limit)
-            ]
-    else:
-        left_limit = right_limit = 0
+    return get_options_chart_payload(ticker, dates, get_market_snapshot(ticker))
 
-    # Оригинальная логика отображения параметров
-    for parameter in selected_params:
-        hover_texts = [
-            f"Strike: {strike}<br>Call OI: {coi}<br>Put OI: {poi}<br>Call Volume: {cvol}<br>Put Volume: {pvol}<br>{parameter}: {val}"
-            for strike, coi, poi, cvol, pvol, val in zip(
-                options_data['strike'],
-                options_data['Call OI'],
-                options_data['Put OI'],
-                options_data['Call Volume'],
-                options_data['Put Volume'],
-                options_data[parameter]
-            )
-        ]
-
-        if parameter == "Net GEX":
-            fig.add_trace(go.Bar(
-                x=options_data['strike'],
-                y=options_data['Net GEX'],
-                marker_color=['#22b5ff' if v >= 0 else 'red' for v in options_data['Net GEX']],
-                name="Net GEX",
-                hovertext=hover_texts,
-                hoverinfo="text",
-                marker=dict(line=dict(width=0))
-            ))
-
-        elif parameter == "AG":
-            fig.add_trace(go.Scatter(
-                x=options_data['strike'],
-                y=options_data['AG'],
-                mode='lines+markers',
-                line=dict(shape='spline', smoothing=0.7),
-                marker=dict(size=8, color='#915bf8'),
-                fill='tozeroy',
-                name="AG",
-                hovertext=hover_texts,
-                hoverinfo="text",
-                yaxis='y2'
-            ))
-
-        elif parameter == "Call OI":
-            fig.add_trace(go.Scatter(
-                x=options_data['strike'],
-                y=options_data['Call OI'],
-                mode='lines+markers',
-                line=dict(shape='spline', smoothing=0.7),
-                marker=dict(size=8, color='#02d432'),
-                fill='tozeroy',
-                name="Call OI",
-                hovertext=hover_texts,
-                hoverinfo="text",
-                yaxis='y2'
-            ))
-
-        elif parameter == "Put OI":
-            fig.add_trace(go.Scatter(
-                x=options_data['strike'],
-                y=options_data['Put OI'],
-                mode='lines+markers',
-                line=dict(shape='spline', smoothing=0.7),
-                marker=dict(size=8, color='#f32d35'),
-                fill='tozeroy',
-                name="Put OI",
-                hovertext=hover_texts,
-                hoverinfo="text",
-                yaxis='y2'
-            ))
-
-        elif parameter == "Call Volume":
-            fig.add_trace(go.Scatter(
-                x=options_data['strike'],
-                y=options_data['Call Volume'],
-                mode='lines+markers',
-                line=dict(shape='spline', smoothing=0.7),
-                marker=dict(size=8, color='#003cfe'),
-                fill='tozeroy',
-                name="Call Volume",
-                hovertext=hover_texts,
-                hoverinfo="text",
-                yaxis='y2'
-            ))
-
-        elif parameter == "Put Volume":
-            fig.add_trace(go.Scatter(
-                x=options_data['strike'],
-                y=options_data['Put Volume'],
-                mode='lines+markers',
-                line=dict(shape='spline', smoothing=0.7),
-                marker=dict(size=8, color='#e55f04'),
-                fill='tozeroy',
-                name="Put Volume",
-                hovertext=hover_texts,
-                hoverinfo="text",
-                yaxis='y2'
-            ))
 
-    if spot_price:
-        fig.add_vline(
-            x=spot_price,
-            line_dash="solid",
-            line_color="orange",
-            annotation_text=f"Price: {spot_price:.2f}",
-            annotation_position="top",
-            annotation_font=dict(color="orange"),
-        )
-
-    # Оригинальное оформление графика
-    fig.update_layout(
-        xaxis=dict(
-            title="Strike",
-            showgrid=False,
-            zeroline=False,
-            tickmode='array',
-            tickvals=options_data['strike'].tolist(),
-            tickformat='1',
-            fixedrange=True
-        ),
-        yaxis=dict(
-            title="Net GEX",
-            side="left",
-            showgrid=False,
-            zeroline=False,
-            fixedrange=True
-        ),
-        yaxis2=dict(
-            title="",
-            side="right",
-            overlaying="y",
-            showgrid=False,
-            zeroline=False,
-            fixedrange=True
-        ),
-        title="" + ticker,
-        plot_bgcolor='#1e1e1e',
-        paper_bgcolor='#1e1e1e',
-        font=dict(color='white'),
-        dragmode=False,
-        showlegend=True,
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=1.02,
-            xanchor="right",
-            x=1
-        )
-    )
-
-    # Добавляем водяной знак
-    fig.add_annotation(
-        xref="paper", yref="paper",
-        x=0.5, y=0.5,
-        text="Max Power",
-        showarrow=False,
-        font=dict(size=80, color="rgba(255, 255, 255, 0.1)"),
-        textangle=0,
-    )
-
-    return fig
+# График опционов строится в браузере (assets/options_chart.js) из данных options-data-store
+app.clientside_callback(
+    ClientsideFunction(namespace='options_chart', function_name='render'),
+    Output('options-chart', 'figure'),
+    [Input('options-data-store', 'data'),
+     Input('selected-params', 'data')],
+    [State('options-chart-template', 'data')]
+)
 
 
 @app.callback(
-    Output('price-chart', 'figure'),
+    [Output('price-chart', 'figure'),
+     Output('price-chart-live', 'data')],
     [Input('search-button', 'n_clicks'),
      Input('ticker-input', 'n_submit')],
     [State('ticker-input', 'value')],
@@ -1612,54 +2479,48 @@ def update_price_chart(n_clicks, n_submit, ticker):
     if not ctx.triggered or ticker is None:
         ticker = 'SPX'  # Устанавливаем SPX по умолчанию
 
-    ticker = normalize_ticker(ticker)
-    interval = '1m'
-    stock = yf.Ticker(ticker)
-    data = stock.history(period='1d', interval=interval)
+    live_chart = get_live_chart('price', ticker)
+    return live_chart.figure, live_chart.state
+
+
+# Функция построения ценового графика по снапшоту (один раз на снапшот, см. get_live_chart)
+def build_price_chart(snapshot):
+    ticker = snapshot.ticker
+    data = snapshot.bars
 
     if data.empty:
         return go.Figure()
 
-    data['CumulativeVolume'] = data['Volume'].cumsum()
-    data['CumulativePV'] = (data['Volume'] * (data['High'] + data['Low'] + data['Close']) / 3).cumsum()
-    data['VWAP'] = data['CumulativePV'] / data['CumulativeVolume']
-
-    options_data, _, spot_price, max_ag_strike = get_option_data(ticker, [])
+    options_data = snapshot.options_data
+    spot_price = snapshot.spot_price
 
     if ticker in ["^SPX", "^NDX", "^RUT", "^DJI", "SPY", "QQQ", "IWM"]:
         price_range = 0.017
     else:
         price_range = 0.05
 
-    if spot_price:
+    if spot_price and options_data is not None:
         left_limit = spot_price - (spot_price * price_range)
         right_limit = spot_price + (spot_price * price_range)
-        options_data = options_data[
-            (options_data['strike'] >= left_limit) & (options_data['strike'] <= right_limit)
-            ]
     else:
         left_limit = right_limit = 0
 
+    # Есть ли страйки в окне - по границам окна в отсортированных страйках снапшота
     if options_data is not None and not options_data.empty:
-        visible_options_data = options_data[
-            (options_data['strike'] >= left_limit) & (options_data['strike'] <= right_limit)
-            ]
+        start, stop = get_strike_window(snapshot, left_limit, right_limit)
     else:
-        visible_options_data = pd.DataFrame()
+        start = stop = 0
 
-    if not visible_options_data.empty:
-        max_ag_strike = visible_options_data.loc[visible_options_data['AG'].idxmax(), 'strike']
+    if stop > start:
+        levels = get_key_levels(snapshot, left_limit, right_limit)
+        max_ag_strike = levels['max_ag']
 
-        # Проверяем наличие положительных значений Net GEX
-        has_positive_gex = (visible_options_data['Net GEX'] > 0).any()
-        if has_positive_gex:
-            max_p1_strike = visible_options_data.loc[visible_options_data['Net GEX'].idxmax(), 'strike']
-        else:
-            max_p1_strike = None
+        # P1 - только при наличии положительных значений Net GEX
+        max_p1_strike = levels['positive_net_gex']
 
-        max_n1_strike = visible_options_data.loc[visible_options_data['Net GEX'].idxmin(), 'strike']
-        max_call_vol_strike = visible_options_data.loc[visible_options_data['Call Volume'].idxmax(), 'strike']
-        max_put_vol_strike = visible_options_data.loc[visible_options_data['Put Volume'].idxmax(), 'strike']
+        max_n1_strike = levels['min_net_gex']
+        max_call_vol_strike = levels['max_call_volume']
+        max_put_vol_strike = levels['max_put_volume']
     else:
         max_ag_strike = None
         max_p1_strike = None
@@ -1667,9 +2528,9 @@ def update_price_chart(n_clicks, n_submit, ticker):
         max_call_vol_strike = None
         max_put_vol_strike = None
 
-    market_open_time = datetime.now().replace(hour=9, minute=30, second=0, microsecond=0)
-    market_close_time = datetime.now().replace(hour=16, minute=0, second=0, microsecond=0)
-    current_time = datetime.now()
+    market_open_time = market_now().replace(hour=9, minute=30, second=0, microsecond=0)
+    market_close_time = market_now().replace(hour=16, minute=0, second=0, microsecond=0)
+    current_time = market_now()
 
     line_widths = {
         'AG': 7,
@@ -1680,6 +2541,7 @@ def update_price_chart(n_clicks, n_submit, ticker):
         'Max Power': 3
     }
 
+    stage_checkpoint('pandas')
     fig = go.Figure()
 
     fig.add_trace(go.Candlestick(
@@ -1796,12 +2658,14 @@ def update_price_chart(n_clicks, n_submit, ticker):
         textangle=0,
     )
 
-    return fig
+    stage_checkpoint('figure')
+    return compact_figure(fig)
 
 
 # Callback для обновления нового графика цены
 @app.callback(
-    Output('price-chart-simplified', 'figure'),
+    [Output('price-chart-simplified', 'figure'),
+     Output('price-chart-simplified-live', 'data')],
     [Input('search-button', 'n_clicks'),
      Input('ticker-input', 'n_submit')],
     [State('ticker-input', 'value')],
@@ -1816,19 +2680,20 @@ def update_price_chart_simplified(n_clicks, n_submit, ticker):
     elif not ticker:  # Если поле пустое
         ticker = 'SPX'
 
-    ticker = normalize_ticker(ticker)
-    interval = '1m'
-    stock = yf.Ticker(ticker)
-    data = stock.history(period='1d', interval=interval)
+    live_chart = get_live_chart('price-simplified', ticker)
+    return live_chart.figure, live_chart.state
+
+
+# Функция построения графика поддержки/сопротивления по снапшоту
+def build_price_chart_simplified(snapshot):
+    ticker = snapshot.ticker
+    data = snapshot.bars
 
     if data.empty:
         return go.Figure()
 
-    data['CumulativeVolume'] = data['Volume'].cumsum()
-    data['CumulativePV'] = (data['Volume'] * (data['High'] + data['Low'] + data['Close']) / 3).cumsum()
-    data['VWAP'] = data['CumulativePV'] / data['CumulativeVolume']
-
-    options_data, _, spot_price, _ = get_option_data(ticker, [])
+    options_data = snapshot.options_data
+    spot_price = snapshot.spot_price
 
     if options_data is None or options_data.empty:
         return go.Figure()
@@ -1855,15 +2720,16 @@ def update_price_chart_simplified(n_clicks, n_submit, ticker):
     if spot_price:
         left_limit = spot_price - (spot_price * price_range)
         right_limit = spot_price + (spot_price * price_range)
-        options_data = options_data[
-            (options_data['strike'] >= left_limit) & (options_data['strike'] <= right_limit)
-            ]
     else:
         left_limit = right_limit = 0
 
-    max_call_vol_strike = options_data.loc[options_data['Call Volume'].idxmax(), 'strike']
-    max_put_vol_strike = options_data.loc[options_data['Put Volume'].idxmax(), 'strike']
-    max_negative_net_gex_strike = options_data.loc[options_data['Net GEX'].idxmin(), 'strike']
+    if spot_price:
+        levels = get_key_levels(snapshot, left_limit, right_limit)
+    else:
+        levels = get_key_levels(snapshot)
+    max_call_vol_strike = levels['max_call_volume']
+    max_put_vol_strike = levels['max_put_volume']
+    max_negative_net_gex_strike = levels['min_net_gex']
 
     resistance_zone_lower = max_call_vol_strike * (1 + resistance_zone_lower_percent)
     resistance_zone_upper = max_call_vol_strike * (1 + resistance_zone_upper_percent)
@@ -1894,8 +2760,8 @@ def update_price_chart_simplified(n_clicks, n_submit, ticker):
         name='VWAP'
     ))
 
-    market_open_time = datetime.now().replace(hour=9, minute=30, second=0, microsecond=0)
-    market_close_time = datetime.now().replace(hour=16, minute=0, second=0, microsecond=0)
+    market_open_time = market_now().replace(hour=9, minute=30, second=0, microsecond=0)
+    market_close_time = market_now().replace(hour=16, minute=0, second=0, microsecond=0)
 
     fig.add_trace(go.Scatter(
         x=[market_open_time, market_close_time, market_close_time, market_open_time],
@@ -1954,7 +2820,7 @@ def update_price_chart_simplified(n_clicks, n_submit, ticker):
         textangle=0,
     )
 
-    return fig
+    return compact_figure(fig)
 
 
 # Callback для обновления страницы
@@ -1992,7 +2858,8 @@ def display_page(pathname, search):
 
 # Callback для обновления графика на странице "Key Levels"
 @app.callback(
-    Output('key-levels-chart', 'figure'),
+    [Output('key-levels-chart', 'figure'),
+     Output('key-levels-chart-live', 'data')],
     [Input('search-button-key-levels', 'n_clicks'),
      Input('ticker-input-key-levels', 'n_submit')],
     [State('ticker-input-key-levels', 'value')],
@@ -2005,27 +2872,20 @@ def update_key_levels_chart_callback(n_clicks, n_submit, ticker):
     if not ctx.triggered or ticker is None:
         ticker = 'SPX'  # Устанавливаем SPX по умолчанию
 
-    return update_key_levels_chart(ticker)
+    live_chart = get_live_chart('key-levels', ticker)
+    return live_chart.figure, live_chart.state
 
-@cache.memoize(timeout=60)  # Кэшируем на 5 минут
-def update_key_levels_chart(ticker):
-    ticker = normalize_ticker(ticker)
-    interval = '1m'
-    stock = yf.Ticker(ticker)
-    data = stock.history(period='1d', interval=interval)
+
+# Функция построения графика ключевых уровней по снапшоту
+def build_key_levels_chart(snapshot):
+    ticker = snapshot.ticker
+    data = snapshot.bars
 
     if data.empty:
         return go.Figure()
 
-    data['CumulativeVolume'] = data['Volume'].cumsum()
-    data['CumulativePV'] = (data['Volume'] * (data['High'] + data['Low'] + data['Close']) / 3).cumsum()
-    data['VWAP'] = data['CumulativePV'] / data['CumulativeVolume']
-
-    if not data.empty:
-        open_price = data['Open'].iloc[0]
-        current_price = data['Close'].iloc[-1]
-    else:
-        open_price = current_price = None
+    open_price = data['Open'].iloc[0]
+    current_price = snapshot.spot_price
 
     # Определяем диапазон для всего графика (4% от цены открытия)
     if ticker in ["^SPX", "^NDX", "^RUT", "^DJI", "^VIX"]:
@@ -2041,18 +2901,16 @@ def update_key_levels_chart(ticker):
     else:
         upper_limit = lower_limit = 0
 
-    options_data, _, spot_price, _ = get_option_data(ticker, [])
+    options_data = snapshot.options_data
+    spot_price = snapshot.spot_price
 
     if options_data is None or options_data.empty:
         return go.Figure()
 
-    # Фильтруем данные опционов в пределах всего диапазона графика
-    options_data = options_data[
-        (options_data['strike'] >= lower_limit) &
-        (options_data['strike'] <= upper_limit)
-        ]
+    # Страйки в пределах всего диапазона графика: позиции [start, stop) в отсортированной цепочке
+    start, stop = get_strike_window(snapshot, lower_limit, upper_limit)
 
-    if options_data.empty:
+    if stop == start:
         return go.Figure()
 
     # 1. Основные уровни в пределах 1% от текущей цены (ОБЯЗАТЕЛЬНЫЕ)
@@ -2062,58 +2920,39 @@ def update_key_levels_chart(ticker):
         one_percent_lower = current_price - one_percent_range
 
         # Сопротивление: максимальный объем коллов в пределах +1%
-        resistance_near = options_data[
-            (options_data['strike'] >= current_price) &
-            (options_data['strike'] <= one_percent_upper)
-            ]
-        if not resistance_near.empty:
-            main_resistance = resistance_near.loc[resistance_near['Call Volume'].idxmax(), 'strike']
-        else:
+        main_resistance = get_key_levels(snapshot, max(lower_limit, current_price),
+                                         min(upper_limit, one_percent_upper))['max_call_volume']
+        if main_resistance is None:
             # Если нет данных в +1%, берем ближайший страйк выше текущей цены с максимальным объемом коллов
-            resistance_above = options_data[options_data['strike'] >= current_price]
-            if not resistance_above.empty:
-                main_resistance = resistance_above.loc[resistance_above['Call Volume'].idxmax(), 'strike']
-            else:
-                main_resistance = None
+            main_resistance = get_key_levels(snapshot, max(lower_limit, current_price), upper_limit)['max_call_volume']
 
         # Поддержка: максимальный объем путов в пределах -1%
-        support_near = options_data[
-            (options_data['strike'] <= current_price) &
-            (options_data['strike'] >= one_percent_lower)
-            ]
-        if not support_near.empty:
-            main_support = support_near.loc[support_near['Put Volume'].idxmax(), 'strike']
-        else:
+        main_support = get_key_levels(snapshot, max(lower_limit, one_percent_lower),
+                                      min(upper_limit, current_price))['max_put_volume']
+        if main_support is None:
             # Если нет данных в -1%, берем ближайший страйк ниже текущей цены с максимальным объемом путов
-            support_below = options_data[options_data['strike'] <= current_price]
-            if not support_below.empty:
-                main_support = support_below.loc[support_below['Put Volume'].idxmax(), 'strike']
-            else:
-                main_support = None
+            main_support = get_key_levels(snapshot, lower_limit, min(upper_limit, current_price))['max_put_volume']
     else:
         main_resistance = main_support = None
 
-    # 2. Глобальные уровни во всем диапазоне (дополнительные)
-    max_call_vol_strike = options_data.loc[options_data['Call Volume'].idxmax(), 'strike']
-    max_put_vol_strike = options_data.loc[options_data['Put Volume'].idxmax(), 'strike']
-    max_negative_net_gex_strike = options_data.loc[options_data['Net GEX'].idxmin(), 'strike']
-    max_ag_strike = options_data.loc[options_data['AG'].idxmax(), 'strike']
-    max_positive_net_gex_strike = options_data.loc[options_data['Net GEX'].idxmax(), 'strike']
-
-    # 3. Определяем G-Flip зону
-    g_flip_zone = None
-    gex_values = options_data['Net GEX'].values
-    for i in range(len(gex_values) - 6):
-        if gex_values[i] < 0 and all(gex_values[i + j] > 0 for j in range(1, 7)):
-            g_flip_zone = options_data.iloc[i]['strike']
-            break
+    # 2. Глобальные уровни во всем диапазоне (дополнительные) и уровни выше/ниже цены
+    levels = get_key_levels(snapshot, lower_limit, upper_limit, spot_price)
+    max_call_vol_strike = levels['max_call_volume']
+    max_put_vol_strike = levels['max_put_volume']
+    max_negative_net_gex_strike = levels['min_net_gex']
+    max_ag_strike = levels['max_ag']
+    max_positive_net_gex_strike = levels['max_net_gex']
+
+    # 3. Определяем G-Flip зону (отрицательный Net GEX, затем положительный) и ноль Net GEX в ней
+    g_flip_zone, g_flip_zero = get_gamma_flip(snapshot, 'up', lower_limit, upper_limit)
 
     # Определяем шаг страйков
-    strike_step = options_data['strike'].diff().dropna().min()
+    strike_step = np.diff(options_data['strike'].to_numpy()[start:stop]).min() if stop - start > 1 else np.nan
     if pd.isna(strike_step) or strike_step == 0:
         strike_step = 1 if ticker in ["^SPX", "^NDX"] else 0.5
 
     # Создаем график
+    stage_checkpoint('pandas')
     fig = go.Figure()
 
     # Добавляем свечной график
@@ -2136,8 +2975,8 @@ def update_key_levels_chart(ticker):
     ))
 
     # Время открытия/закрытия рынка
-    market_open_time = datetime.now().replace(hour=9, minute=30, second=0, microsecond=0)
-    market_close_time = datetime.now().replace(hour=16, minute=0, second=0, microsecond=0)
+    market_open_time = market_now().replace(hour=9, minute=30, second=0, microsecond=0)
+    market_close_time = market_now().replace(hour=16, minute=0, second=0, microsecond=0)
 
     # 1. ОСНОВНЫЕ УРОВНИ (1% диапазон) - ПРИОРИТЕТНЫЕ
     if main_resistance:
@@ -2228,12 +3067,12 @@ def update_key_levels_chart(ticker):
             fillcolor="rgba(102, 187, 106, 0.2)",
             line=dict(color="rgba(102, 187, 106, 0.5)"),
             mode="lines",
-            name=f'G-Flip Zone ({g_flip_zone:.2f})',
+            name=f'G-Flip Zone ({g_flip_zone:.2f}, zero {g_flip_zero:.2f})',
             hoverinfo="none",
         ))
 
     # 4. СТАТИЧЕСКИЕ УРОВНИ (рассчитанные по всей гамме)
-    resistance_levels, support_levels = calculate_static_levels(options_data, spot_price)
+    resistance_levels, support_levels = calculate_static_levels(levels)
     fig = add_static_levels_to_chart(fig, resistance_levels, support_levels, market_open_time, market_close_time)
 
     # Настраиваем layout графика
@@ -2282,97 +3121,373 @@ def update_key_levels_chart(ticker):
         textangle=0,
     )
 
-    return fig
+    stage_checkpoint('figure')
+    return compact_figure(fig)
+
+
+# Живое обновление графиков цены. По событию потока SSE (или раз в LIVE_UPDATE_SECONDS без него)
+# страница получает Patch: последний бар (он мог еще формироваться), новые минутные бары и изменившиеся
+# линии уровней. Фигура строится один раз на снапшот для всех зрителей, на зрителя остается сравнение
+# его состояния графика (dcc.Store '<график>-live') с состоянием готовой фигуры
+LIVE_CHARTS_CACHE_SIZE = 64
+
+LIVE_CHART_BUILDERS = {
+    'price': build_price_chart,
+    'price-simplified': build_price_chart_simplified,
+    'key-levels': build_key_levels_chart,
+}
+
+# Поля трасс по барам (свечи и VWAP), которые продолжаются через Patch
+LIVE_BAR_FIELDS = ('x', 'open', 'high', 'low', 'close', 'y')
+
+# Готовая фигура графика (JSON, как уходит в браузер) и ее состояние
+LiveChart = namedtuple('LiveChart', ['figure', 'state'])
+_live_charts = OrderedDict()
+_live_charts_guard = threading.Lock()
+
+
+def _live_chart_checksum(value):
+    return zlib.crc32(json.dumps(value, sort_keys=True).encode())
+
+
+# Состояние фигуры: снапшот, число трасс по барам (идут первыми, x - время бара свечей),
+# число баров, время последнего бара и контрольные суммы остальных трасс и лейаута
+def _live_chart_state(snapshot, figure):
+    data = figure.get('data', [])
+    bar_times = data[0].get('x', []) if data and data[0].get('type') == 'candlestick' else []
+    bar_traces = 0
+    while bar_times and bar_traces < len(data) and data[bar_traces].get('x') == bar_times:
+        bar_traces += 1
+    return {
+        'ticker': snapshot.ticker,
+        'created_at': snapshot.created_at,
+        'bar_traces': bar_traces,
+        'bars': len(bar_times),
+        'last_bar': bar_times[-1] if bar_times else None,
+        'traces': [_live_chart_checksum(trace) for trace in data[bar_traces:]],
+        'layout': _live_chart_checksum(figure.get('layout', {})),
+    }
+
+
+# Функция получения графика по текущему снапшоту тикера: строится один раз на снапшот
+def get_live_chart(chart, ticker):
+    snapshot = get_market_snapshot(normalize_ticker(ticker))
+    stage_checkpoint('fetch')
+    key = (chart, snapshot.ticker, snapshot.created_at)
+    with _live_charts_guard:
+        live_chart = _live_charts.get(key)
+        if live_chart is not None:
+            _live_charts.move_to_end(key)
+            return live_chart
+
+    def build():
+        figure = json.loads(pio.to_json(LIVE_CHART_BUILDERS[chart](snapshot)))
+        result = LiveChart(figure, _live_chart_state(snapshot, figure))
+        with _live_charts_guard:
+            _live_charts[key] = result
+            if len(_live_charts) > LIVE_CHARTS_CACHE_SIZE:
+                _live_charts.popitem(last=False)
+        return result
+
+    return single_flight(f"live_chart:{chart}:{snapshot.ticker}:{snapshot.created_at}", build)
+
+
+# Функция обновления графика зрителя до текущего снапшота: (Patch или вся фигура, новое состояние).
+# Вся фигура уходит, только если изменился лейаут, набор трасс уровней или бары не продолжают
+# бары зрителя (новый день, другой тикер). Без нового снапшота - no_update.
+def live_chart_update(chart, state):
+    if not state:
+        return dash.no_update, dash.no_update
+    live_chart = get_live_chart(chart, state['ticker'])
+    new_state = live_chart.state
+    if new_state['created_at'] == state['created_at']:
+        return dash.no_update, dash.no_update
+
+    data = live_chart.figure['data']
+    bars = state['bars']
+    if (new_state['layout'] != state['layout'] or new_state['bar_traces'] != state['bar_traces']
+            or len(new_state['traces']) != len(state['traces'])
+            or not 0 < bars <= new_state['bars'] or data[0]['x'][bars - 1] != state['last_bar']):
+        return live_chart.figure, new_state
+
+    patched = Patch()
+    for position in range(new_state['bar_traces']):
+        trace = data[position]
+        for name in LIVE_BAR_FIELDS:
+            if name in trace:
+                patched['data'][position][name][bars - 1] = trace[name][bars - 1]
+                if new_state['bars'] > bars:
+                    patched['data'][position][name].extend(trace[name][bars:])
+    for position, (old, new) in enumerate(zip(state['traces'], new_state['traces']), new_state['bar_traces']):
+        if old != new:
+            patched['data'][position] = data[position]
+    stage_checkpoint('figure')
+    return patched, new_state
+
+
+# Живое обновление графиков главной страницы
+@app.callback(
+    [Output('price-chart', 'figure', allow_duplicate=True),
+     Output('price-chart-live', 'data', allow_duplicate=True),
+     Output('price-chart-simplified', 'figure', allow_duplicate=True),
+     Output('price-chart-simplified-live', 'data', allow_duplicate=True)],
+    [Input('live-snapshot', 'data'),
+     Input('live-interval', 'n_intervals')],
+    [State('price-chart-live', 'data'),
+     State('price-chart-simplified-live', 'data')],
+    prevent_initial_call=True
+)
+def update_price_charts_live(live_snapshot, n_intervals, price_state, simplified_state):
+    return live_chart_update('price', price_state) + live_chart_update('price-simplified', simplified_state)
+
+
+# Живое обновление графика на странице "Key Levels"
+@app.callback(
+    [Output('key-levels-chart', 'figure', allow_duplicate=True),
+     Output('key-levels-chart-live', 'data', allow_duplicate=True)],
+    [Input('live-snapshot-key-levels', 'data'),
+     Input('live-interval-key-levels', 'n_intervals')],
+    [State('key-levels-chart-live', 'data')],
+    prevent_initial_call=True
+)
+def update_key_levels_chart_live(live_snapshot, n_intervals, state):
+    return live_chart_update('key-levels', state)
+
+
+# Подписка страницы на поток SSE тикера ее графика (assets/live_updates.js)
+if LIVE_STREAMS_ENABLED:
+    app.clientside_callback(
+        ClientsideFunction(namespace='live_updates', function_name='index'),
+        Output('live-snapshot', 'data'),
+        [Input('price-chart-live', 'data')]
+    )
+    app.clientside_callback(
+        ClientsideFunction(namespace='live_updates', function_name='key_levels'),
+        Output('live-snapshot-key-levels', 'data'),
+        [Input('key-levels-chart-live', 'data')]
+    )
+
 
 # Callback для обновления таблицы Options Summary
 @app.callback(
     Output('options-summary-table', 'data'),
-    [Input('url', 'pathname')]  # Используем изменение URL как триггер
+    [Input('url', 'pathname'),  # Используем изменение URL как триггер
+     Input('summary-interval', 'n_intervals')]
 )
-def update_options_summary_table(pathname):
+def update_options_summary_table(pathname, n_intervals):
     if pathname == '/options-summary':
         return get_pc_ratio_data()
     return []
 
 
-@cache.memoize(timeout=600)  # Кэшируем на 10 минут
-def get_pc_ratio_data():
-    # Определяем индексы и ETF
-    indices_etfs = ["SPX", "SPY", "QQQ", "VIX", "DIA", "IWM", "RUT"]
-    # Показываем данные для всех запрошенных тикеров
-    tickers = indices_etfs + [
-        "NVDA", "AAPL", "TSLA", "META", "MSFT", "GOOG",
-        "AMZN", "AVGO", "WMT", "JPM", "MU", "BA", "SNOW",
-        "UBER", "ROKU", "PLTR", "GS", "COIN"
-    ]
+# Индексы и ETF для страницы P/C Ratio
+PC_RATIO_INDICES_ETFS = ["SPX", "SPY", "QQQ", "VIX", "DIA", "IWM", "RUT"]
+# Все тикеры страницы P/C Ratio
+PC_RATIO_TICKERS = PC_RATIO_INDICES_ETFS + [
+    "NVDA", "AAPL", "TSLA", "META", "MSFT", "GOOG",
+    "AMZN", "AVGO", "WMT", "JPM", "MU", "BA", "SNOW",
+    "UBER", "ROKU", "PLTR", "GS", "COIN"
+]
+
+# Сколько секунд таблица ждет строки тикеров; не успевшие тикеры догружаются в фоне
+PC_RATIO_TIMEOUT = 5
+# Число параллельных расчетов строк таблицы
+PC_RATIO_MAX_WORKERS = 10
+# Сколько хранится последняя посчитанная строка тикера (секунды)
+PC_RATIO_ROW_TTL = 600
+
+_pc_ratio_executor = ThreadPoolExecutor(max_workers=PC_RATIO_MAX_WORKERS, thread_name_prefix='pc-ratio')
+# Строки, которые считаются прямо сейчас: зависший тикер не запускается повторно
+_pc_ratio_inflight = {}
+_pc_ratio_inflight_guard = threading.Lock()
+
+
+# Функция расчета строки таблицы P/C Ratio для одного тикера
+def build_pc_ratio_row(ticker):
+    # Цена и цепочка берутся из снапшота, который держит в тепле фоновый планировщик
+    snapshot = get_market_snapshot(ticker)
+    price = snapshot.spot_price
+    options_data = snapshot.options_data
+
+    if options_data is None or options_data.empty or price is None:
+        return None
+
+    # Определяем диапазон цены в зависимости от типа тикера
+    if ticker in PC_RATIO_INDICES_ETFS:
+        price_range = 0.01  # 1% для индексов и ETF
+    else:
+        price_range = 0.05  # 5% для акций
 
-    table_data = []
+    # Окно страйков в пределах диапазона цены (только для Resistance и Support)
+    lower_limit = price * (1 - price_range)
+    upper_limit = price * (1 + price_range)
+    start, stop = get_strike_window(snapshot, lower_limit, upper_limit)
 
-    for ticker in tickers:
-        normalized_ticker = normalize_ticker(ticker)
-        stock = yf.Ticker(normalized_ticker)
+    if stop == start:
+        return None
 
-        try:
-            price = stock.history(period='1d')['Close'].iloc[-1]
-        except:
-            price = None
+    levels = get_key_levels(snapshot, lower_limit, upper_limit)
 
-        options_data, _, spot_price, _ = get_option_data(normalized_ticker, [])
+    # Рассчитываем Resistance (максимальный Call Volume в пределах диапазона)
+    max_call_vol_strike = levels['max_call_volume']
 
-        if options_data is None or options_data.empty or price is None:
-            continue
+    # Рассчитываем Support (максимальный Put Volume или минимальный Net GEX в пределах диапазона)
+    max_put_vol_strike = levels['max_put_volume']
+    max_negative_net_gex_strike = levels['min_net_gex']
 
-        # Определяем диапазон цены в зависимости от типа тикера
-        if ticker in indices_etfs:
-            price_range = 0.01  # 1% для индексов и ETF
-        else:
-            price_range = 0.05  # 5% для акций
-
-        # Фильтруем данные опционов в пределах диапазона цены (только для Resistance и Support)
-        lower_limit = price * (1 - price_range)
-        upper_limit = price * (1 + price_range)
-        filtered_data = options_data[
-            (options_data['strike'] >= lower_limit) &
-            (options_data['strike'] <= upper_limit)
-            ]
+    if max_put_vol_strike < max_negative_net_gex_strike:
+        support_strike = max_put_vol_strike
+    else:
+        support_strike = max_negative_net_gex_strike
+
+    # Суммируем Call OI и Put OI по ВСЕМ опционам (не только в пределах диапазона)
+    chain_totals = get_window_sums(snapshot)
+    call_oi_amount = chain_totals['Call OI']
+    put_oi_amount = chain_totals['Put OI']
+
+    # Рассчитываем P/C Ratio
+    pc_ratio = put_oi_amount / call_oi_amount if call_oi_amount != 0 else float('inf')
+
+    return {
+        'Ticker': ticker,
+        'Price': round(price, 2),
+        'Resistance': round(max_call_vol_strike, 2),
+        'Support': round(support_strike, 2),
+        'Call OI Amount': f"{call_oi_amount:,.0f}",
+        'Put OI Amount': f"{put_oi_amount:,.0f}",
+        'P/C Ratio': f"{pc_ratio:.2f}"
+    }
 
-        if filtered_data.empty:
-            continue
 
-        # Рассчитываем Resistance (максимальный Call Volume в пределах диапазона)
-        max_call_vol_strike = filtered_data.loc[filtered_data['Call Volume'].idxmax(), 'strike']
+def _build_and_cache_pc_ratio_row(ticker):
+    try:
+        row = build_pc_ratio_row(ticker)
+    except Exception as e:
+        print(f"Ошибка расчета P/C Ratio для {ticker}: {e}")
+        return None
+
+    if row is not None:
+        cache.set(f"pc_row:{ticker}", row, timeout=PC_RATIO_ROW_TTL)
+    return row
 
-        # Рассчитываем Support (максимальный Put Volume или минимальный Net GEX в пределах диапазона)
-        max_put_vol_strike = filtered_data.loc[filtered_data['Put Volume'].idxmax(), 'strike']
-        max_negative_net_gex_strike = filtered_data.loc[filtered_data['Net GEX'].idxmin(), 'strike']
 
-        if max_put_vol_strike < max_negative_net_gex_strike:
-            support_strike = max_put_vol_strike
+def _submit_pc_ratio_row(ticker):
+    with _pc_ratio_inflight_guard:
+        future = _pc_ratio_inflight.get(ticker)
+        if future is None or future.done():
+            future = _pc_ratio_executor.submit(_build_and_cache_pc_ratio_row, ticker)
+            _pc_ratio_inflight[ticker] = future
+        return future
+
+
+# Функция получения данных таблицы: тикеры считаются параллельно, таблица ждет не дольше
+# PC_RATIO_TIMEOUT. Для не успевших тикеров берется последняя готовая строка, если она есть,
+# а их расчет продолжается в фоне и попадет в таблицу при следующем обновлении.
+def get_pc_ratio_data():
+    futures = {ticker: _submit_pc_ratio_row(ticker) for ticker in PC_RATIO_TICKERS}
+    wait(futures.values(), timeout=PC_RATIO_TIMEOUT)
+    stage_checkpoint('fetch')
+
+    table_data = []
+
+    for ticker, future in futures.items():
+        if future.done():
+            row = future.result()
         else:
-            support_strike = max_negative_net_gex_strike
-
-        # Суммируем Call OI и Put OI по ВСЕМ опционам (не только в пределах диапазона)
-        call_oi_amount = options_data['Call OI'].sum()
-        put_oi_amount = options_data['Put OI'].sum()
-
-        # Рассчитываем P/C Ratio
-        pc_ratio = put_oi_amount / call_oi_amount if call_oi_amount != 0 else float('inf')
-
-        table_data.append({
-            'Ticker': ticker,
-            'Price': round(price, 2),
-            'Resistance': round(max_call_vol_strike, 2),
-            'Support': round(support_strike, 2),
-            'Call OI Amount': f"{call_oi_amount:,.0f}",
-            'Put OI Amount': f"{put_oi_amount:,.0f}",
-            'P/C Ratio': f"{pc_ratio:.2f}"
-        })
+            print(f"P/C Ratio для {ticker} еще загружается")
+            row = cache.get(f"pc_row:{ticker}")
+
+        if row is not None:
+            table_data.append(row)
 
     return table_data
 
 
+# Фоновый прогрев снапшотов: SPX и все тикеры страницы P/C Ratio
+# (PREFETCH_ENABLED=0 отключает его, например для бенчмарков)
+PREFETCH_ENABLED = os.environ.get('PREFETCH_ENABLED', '1') == '1'
+PREFETCH_TICKERS = ["SPX"] + PC_RATIO_TICKERS
+
+# При нескольких воркерах прогрев выполняет один из них - захвативший файловую блокировку.
+# Остальные раз в PREFETCH_LOCK_RETRY секунд пробуют ее захватить (если воркер-лидер перезапущен).
+# Блокировка действует в пределах одного сервера, на остальных серверах - PREFETCH_ENABLED=0.
+# Файл блокировки - рядом с каталогом кэша: воркеры с общим кэшем делят одного лидера.
+PREFETCH_LOCK_FILE = os.environ.get('PREFETCH_LOCK_FILE', f"{CACHE_CONFIG['CACHE_DIR'].rstrip('/')}.prefetch.lock")
+PREFETCH_LOCK_RETRY = 30
+
+_prefetch_scheduler = None
+_prefetch_lock_file = None
+
+
+def start_prefetch_scheduler():
+    global _prefetch_scheduler
+    if _prefetch_scheduler is not None:
+        return _prefetch_scheduler
+
+    # Явная зона UTC: APScheduler 3.6 не принимает zoneinfo-зону, которую возвращает tzlocal
+    scheduler = BackgroundScheduler(daemon=True, timezone='UTC')
+    for ticker in dict.fromkeys(normalize_ticker(ticker) for ticker in PREFETCH_TICKERS):
+        refresh_interval, _ = get_snapshot_refresh_config(ticker)
+        scheduler.add_job(
+            refresh_market_snapshot,
+            'interval',
+            seconds=refresh_interval,
+            args=[ticker],
+            kwargs={'force': True},
+            id=f"prefetch:{ticker}",
+            next_run_time=datetime.now(timezone.utc),  # Первый прогрев сразу после старта
+            max_instances=1,
+            coalesce=True,
+            # Запуск, не успевший начаться вовремя (все потоки планировщика заняты), выполняется позже,
+            # а не пропускается до следующего интервала
+            misfire_grace_time=None
+        )
+    scheduler.start()
+    _prefetch_scheduler = scheduler
+    return scheduler
+
+
+def acquire_prefetch_lock():
+    global _prefetch_lock_file
+    if fcntl is None:
+        return True
+    lock_file = open(PREFETCH_LOCK_FILE, 'a')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    # Файл держится открытым до конца процесса: блокировка снимается при его завершении
+    _prefetch_lock_file = lock_file
+    return True
+
+
+def _start_prefetch_when_lock_acquired():
+    while not acquire_prefetch_lock():
+        time.sleep(PREFETCH_LOCK_RETRY)
+    print(f"Процесс {os.getpid()} запускает прогрев снапшотов")
+    start_prefetch_scheduler()
+
+
+def start_prefetch():
+    threading.Thread(target=_start_prefetch_when_lock_acquired, daemon=True, name='prefetch-lock').start()
+
+
+# Тикеры прогрева известны до старта планировщика, чтобы готовность ждала их обновления
+if PREFETCH_ENABLED:
+    _warm_state['pending'].update(normalize_ticker(ticker) for ticker in PREFETCH_TICKERS)
+
+if WARM_RESTART_ENABLED:
+    warm_start(PREFETCH_TICKERS)
+else:
+    with _warm_state_guard:
+        _warm_state['restore_seconds'] = 0.0
+        _mark_ready_if_warmed()
+
+if PREFETCH_ENABLED:
+    start_prefetch()
 
 
 # Запуск приложения
 if __name__ == '__main__':
-    app.run(host="0.0.0.0", port=8080)
\ No newline at end of file
+    app.run(host="0.0.0.0", port=int(os.environ.get('PORT', 8080)))
\ No newline at end of file
@@ -0,0 +1,68 @@
+// Живое обновление графиков цены по SSE (/live/<тикер>, см. live_hub.py и live_stream в app.py).
+// Подписка открывается на тикер графика из его состояния ('<график>-live'), каждое событие snapshot
+// записывается в dcc.Store событий страницы, а он запускает серверный колбэк с Patch графиков.
+// Если поток недоступен (сервер ответил 503 или браузер без EventSource) - включается проверка по интервалу.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    live_updates: (function () {
+        // Одна подписка на вкладку: открыта одна страница с одним тикером
+        var current = null;
+
+        function close() {
+            if (current) {
+                current.source.close();
+                current = null;
+            }
+        }
+
+        function fallbackToInterval(intervalId) {
+            window.dash_clientside.set_props(intervalId, {disabled: false});
+        }
+
+        function subscriber(graphId, eventStoreId, intervalId) {
+            return function (state) {
+                var noUpdate = window.dash_clientside.no_update;
+                if (!state || !state.ticker) {
+                    return noUpdate;
+                }
+                if (!window.EventSource) {
+                    fallbackToInterval(intervalId);
+                    return noUpdate;
+                }
+                if (current && current.ticker === state.ticker && current.graphId === graphId) {
+                    return noUpdate;
+                }
+
+                close();
+                var source = new EventSource('/live/' + encodeURIComponent(state.ticker));
+                var subscription = {ticker: state.ticker, graphId: graphId, source: source};
+                source.addEventListener('snapshot', function (event) {
+                    // Страница с графиком закрыта (переход на другую страницу) - подписка больше не нужна
+                    if (!document.getElementById(graphId)) {
+                        if (current === subscription) {
+                            close();
+                        } else {
+                            source.close();
+                        }
+                        return;
+                    }
+                    window.dash_clientside.set_props(eventStoreId, {data: JSON.parse(event.data)});
+                });
+                source.onerror = function () {
+                    // Обрыв соединения EventSource переподключает сам, закрытый поток - отказ сервера
+                    if (source.readyState === EventSource.CLOSED && current === subscription
+                            && document.getElementById(graphId)) {
+                        current = null;
+                        fallbackToInterval(intervalId);
+                    }
+                };
+                current = subscription;
+                return noUpdate;
+            };
+        }
+
+        return {
+            index: subscriber('price-chart', 'live-snapshot', 'live-interval'),
+            key_levels: subscriber('key-levels-chart', 'live-snapshot-key-levels', 'live-interval-key-levels')
+        };
+    })()
+});
@@ -0,0 +1,169 @@
+// Отрисовка графика опционов в браузере из options-data-store (см. get_options_chart_payload в app.py).
+// Сервер один раз отдает цепочку выбранного тикера и дат, а фильтр страйков по цене,
+// переключение параметров, цвета столбцов и подписи считаются здесь, без запросов к серверу.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    options_chart: (function () {
+        // Цвета линий параметров (Net GEX - столбцы, цвет по знаку)
+        var LINE_COLORS = {
+            'AG': '#915bf8',
+            'Call OI': '#02d432',
+            'Put OI': '#f32d35',
+            'Call Volume': '#003cfe',
+            'Put Volume': '#e55f04'
+        };
+
+        // Net GEX >= 0 - синий, < 0 - красный: цвет столбца считает plotly по значению (cmid = 0),
+        // без массива цветов по страйкам
+        var NET_GEX_COLORSCALE = [[0, 'red'], [0.5, 'red'], [0.5, '#22b5ff'], [1, '#22b5ff']];
+
+        // Колонки customdata: OI и объемы страйка, общие для всех трасс
+        var CUSTOMDATA_COLUMNS = ['Call OI', 'Put OI', 'Call Volume', 'Put Volume'];
+
+        // Подпись точки: значения страйка из customdata, форматирование - в plotly при наведении
+        function hoverTemplate(parameter) {
+            var valueFormat = parameter === 'Net GEX' || parameter === 'AG' ? ':.1f' : '';
+            return 'Strike: %{x:.2~f}' +
+                CUSTOMDATA_COLUMNS.map(function (column, k) {
+                    return '<br>' + column + ': %{customdata[' + k + ']}';
+                }).join('') +
+                '<br>' + parameter + ': %{y' + valueFormat + '}<extra></extra>';
+        }
+
+        // Позиции страйков в диапазоне +-price_range от цены (без цены - все страйки)
+        function visiblePositions(payload) {
+            var positions = [];
+            var spot = payload.spot_price;
+            var left = spot ? spot - spot * payload.price_range : -Infinity;
+            var right = spot ? spot + spot * payload.price_range : Infinity;
+            for (var i = 0; i < payload.strike.length; i++) {
+                if (payload.strike[i] >= left && payload.strike[i] <= right) {
+                    positions.push(i);
+                }
+            }
+            return positions;
+        }
+
+        function pick(values, positions) {
+            return positions.map(function (i) { return values[i]; });
+        }
+
+        function buildTrace(parameter, payload, positions, strikes, customdata) {
+            if (parameter !== 'Net GEX' && !LINE_COLORS[parameter]) {
+                return null;
+            }
+            var values = pick(payload[parameter], positions);
+
+            if (parameter === 'Net GEX') {
+                return {
+                    type: 'bar',
+                    x: strikes,
+                    y: values,
+                    marker: {
+                        color: values,
+                        colorscale: NET_GEX_COLORSCALE,
+                        cmid: 0,
+                        showscale: false,
+                        line: {width: 0}
+                    },
+                    name: 'Net GEX',
+                    customdata: customdata,
+                    hovertemplate: hoverTemplate(parameter)
+                };
+            }
+            return {
+                type: 'scatter',
+                x: strikes,
+                y: values,
+                mode: 'lines+markers',
+                line: {shape: 'spline', smoothing: 0.7},
+                marker: {size: 8, color: LINE_COLORS[parameter]},
+                fill: 'tozeroy',
+                name: parameter,
+                customdata: customdata,
+                hovertemplate: hoverTemplate(parameter),
+                yaxis: 'y2'
+            };
+        }
+
+        function render(payload, selectedParams, template) {
+            if (!payload || !selectedParams || !selectedParams.length) {
+                return {data: [], layout: {template: template}};
+            }
+
+            var positions = visiblePositions(payload);
+            var strikes = pick(payload.strike, positions);
+            var spot = payload.spot_price;
+            var customdata = positions.map(function (i) {
+                return CUSTOMDATA_COLUMNS.map(function (column) { return payload[column][i]; });
+            });
+
+            var data = [];
+            selectedParams.forEach(function (parameter) {
+                var trace = buildTrace(parameter, payload, positions, strikes, customdata);
+                if (trace) {
+                    data.push(trace);
+                }
+            });
+
+            var shapes = [];
+            var annotations = [];
+            if (spot) {
+                shapes.push({
+                    type: 'line', x0: spot, x1: spot, xref: 'x', y0: 0, y1: 1, yref: 'y domain',
+                    line: {color: 'orange', dash: 'solid'}
+                });
+                annotations.push({
+                    text: 'Price: ' + spot.toFixed(2), x: spot, xref: 'x', y: 1, yref: 'y domain',
+                    xanchor: 'center', yanchor: 'bottom', showarrow: false, font: {color: 'orange'}
+                });
+            }
+            // Водяной знак
+            annotations.push({
+                xref: 'paper', yref: 'paper', x: 0.5, y: 0.5, text: 'Max Power', showarrow: false,
+                font: {size: 80, color: 'rgba(255, 255, 255, 0.1)'}, textangle: 0
+            });
+
+            return {
+                data: data,
+                layout: {
+                    template: template,
+                    shapes: shapes,
+                    annotations: annotations,
+                    xaxis: {
+                        title: {text: 'Strike'},
+                        showgrid: false,
+                        zeroline: false,
+                        tickmode: 'array',
+                        tickvals: strikes,
+                        tickformat: '1',
+                        fixedrange: true
+                    },
+                    yaxis: {
+                        title: {text: 'Net GEX'},
+                        side: 'left',
+                        showgrid: false,
+                        zeroline: false,
+                        fixedrange: true
+                    },
+                    yaxis2: {
+                        title: {text: ''},
+                        side: 'right',
+                        overlaying: 'y',
+                        showgrid: false,
+                        zeroline: false,
+                        fixedrange: true
+                    },
+                    title: {text: payload.ticker},
+                    plot_bgcolor: '#1e1e1e',
+                    paper_bgcolor: '#1e1e1e',
+                    font: {color: 'white'},
+                    dragmode: false,
+                    showlegend: true,
+                    legend: {orientation: 'h', yanchor: 'bottom', y: 1.02, xanchor: 'right', x: 1}
+                }
+            };
+        }
+
+        return {render: render};
+    })()
+});
@@ -0,0 +1,224 @@
+# Бенчмарк колбэков дашборда по стадиям: fetch (снапшот и цепочки), pandas (расчеты),
+# figure (сборка графика / разметки), json (сериализация ответа, как в Dash) и other (остаток).
+# Данные - фикстуры провайдера replay: записанные ранее (MARKET_DATA_PROVIDER=record, --fixtures)
+# или синтетические с фиксированным seed. Размер цепочки масштабируется числом экспираций.
+# Запуск из корня репозитория:
+#   python benchmarks/bench_callbacks.py --expirations 1,5,20,all --output bench-callbacks.json
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import pandas as pd
+
+from chain_format import cast_chain
+from market_data import MarketDataProvider, RecordingProvider
+
+STAGES = ['fetch', 'pandas', 'figure', 'json', 'other']
+
+# Цены синтетических тикеров (остальные тикеры P/C Ratio - 200)
+SYNTHETIC_SPOTS = {'^SPX': 5800.0, '^RUT': 2300.0, '^VIX': 18.0, 'SPY': 580.0, 'QQQ': 500.0,
+                   'IWM': 230.0, 'DIA': 430.0}
+
+
+# Синтетический источник данных: детерминированные цепочки, минутные и дневные бары
+class SyntheticProvider(MarketDataProvider):
+    def __init__(self, expiration_count, strike_count):
+        self.expiration_count = expiration_count
+        self.strike_count = strike_count
+        self.today = pd.Timestamp.now(tz='America/New_York').normalize()
+
+    def _rng(self, ticker, salt=''):
+        return np.random.default_rng(sum(map(ord, ticker + salt)))
+
+    def expirations(self, ticker):
+        # Рабочие дни начиная с сегодняшнего (в выходные - с понедельника), без повторов дат
+        return [str(day.date()) for day in pd.bdate_range(start=self.today, periods=self.expiration_count)]
+
+    def option_chain(self, ticker, expiration):
+        rng = self._rng(ticker, expiration)
+        spot = SYNTHETIC_SPOTS.get(ticker, 200.0)
+        strikes = np.round(np.linspace(spot * 0.7, spot * 1.3, self.strike_count), 1)
+        size = len(strikes)
+        return cast_chain(pd.DataFrame({
+            'strike': strikes,
+            'Call OI': rng.integers(0, 20000, size),
+            'Call Volume': rng.integers(0, 10000, size),
+            'Call IV': rng.uniform(0.08, 0.6, size),
+            'Put OI': rng.integers(0, 20000, size),
+            'Put Volume': rng.integers(0, 10000, size),
+            'Put IV': rng.uniform(0.08, 0.6, size),
+        }))
+
+    def _bars(self, ticker, index):
+        rng = self._rng(ticker, 'bars')
+        spot = SYNTHETIC_SPOTS.get(ticker, 200.0)
+        close = spot * (1 + np.cumsum(rng.normal(0, 0.0005, len(index))))
+        return pd.DataFrame({
+            'Open': close * (1 + rng.normal(0, 0.0002, len(index))),
+            'High': close * 1.0005,
+            'Low': close * 0.9995,
+            'Close': close,
+            'Volume': rng.integers(1000, 50000, len(index)).astype(float),
+        }, index=index)
+
+    def intraday_bars(self, ticker, start=None):
+        bars = self._bars(ticker, pd.date_range(self.today + pd.Timedelta(hours=9.5), periods=390, freq='1min'))
+        return bars[bars.index >= start] if start is not None else bars
+
+    def daily_bars(self, ticker, period):
+        days = {'1d': 1, '3mo': 63}.get(period, 63)
+        return self._bars(ticker, pd.bdate_range(end=self.today, periods=days, tz='America/New_York'))
+
+
+# Запись синтетических фикстур в формате провайдера replay
+def write_synthetic_fixtures(root, tickers, expiration_count, strike_count):
+    recorder = RecordingProvider(SyntheticProvider(expiration_count, strike_count), root)
+    for ticker in tickers:
+        for expiration in recorder.expirations(ticker):
+            recorder.option_chain(ticker, expiration)
+        recorder.intraday_bars(ticker)
+        recorder.daily_bars(ticker, '1d')
+        recorder.daily_bars(ticker, '3mo')
+
+
+def git_revision():
+    try:
+        revision = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+        dirty = subprocess.call(['git', 'diff', '--quiet', 'HEAD', '--', '*.py'], cwd=ROOT) != 0
+        return revision + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def percentiles(values):
+    return {'p50_ms': round(float(np.percentile(values, 50)) * 1000, 3),
+            'p95_ms': round(float(np.percentile(values, 95)) * 1000, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--fixtures', help='каталог записанных фикстур (по умолчанию - синтетические)')
+    parser.add_argument('--expirations', default='1,5,20,all',
+                        help='число экспираций на графике опционов через запятую, all - все')
+    parser.add_argument('--synthetic-expirations', type=int, default=60)
+    parser.add_argument('--strikes', type=int, default=400, help='страйков на экспирацию (синтетические данные)')
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--cold', action='store_true', help='очищать кэш перед каждым прогоном')
+    parser.add_argument('--output', help='файл для результатов в JSON')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='bench-callbacks-')
+    fixtures = args.fixtures
+    if fixtures is None:
+        fixtures = os.path.join(work_dir, 'fixtures')
+
+    # Настройки окружения должны быть заданы до импорта app
+    os.environ.update({
+        'MARKET_DATA_PROVIDER': 'replay',
+        'MARKET_DATA_FIXTURES': fixtures,
+        'MARKET_DATA_LATENCY_MS': '0',
+        'CACHE_DIR': os.path.join(work_dir, 'cache'),
+        'PREFETCH_ENABLED': '0',
+        'SNAPSHOT_STORE_ENABLED': '0',
+        'WARM_RESTART': '0',
+    })
+    import app
+    from dash._callback_context import context_value
+    from dash._utils import AttributeDict, to_json
+
+    if args.fixtures is None:
+        tickers = list(dict.fromkeys(['^SPX'] + [app.normalize_ticker(ticker) for ticker in app.PC_RATIO_TICKERS]))
+        write_synthetic_fixtures(fixtures, tickers, args.synthetic_expirations, args.strikes)
+
+    # Колбэки читают dash.callback_context, как при нажатии Search
+    context_value.set(AttributeDict(triggered_inputs=[{'prop_id': 'search-button.n_clicks', 'value': 1}]))
+
+    available_dates = app.get_expiration_dates('SPX')
+    cases = {}
+    # Сброс кэшей перед каждым прогоном кейса: без него замер - попадание в кэш, а не расчет
+    resets = {}
+    # График опционов строится в браузере: на сервере - только данные для options-data-store.
+    # Данные кэшируются на снапшот, поэтому кэш сбрасывается: иначе не видно роста с числом экспираций
+    for count in args.expirations.split(','):
+        dates = available_dates if count == 'all' else available_dates[:int(count)]
+        name = f"update_options_data_store[{len(dates)} exp]"
+        cases[name] = lambda dates=dates: app.update_options_data_store(1, None, dates, 'SPX')
+        resets[name] = app._options_chart_payloads.clear
+
+    # Графики цены строятся один раз на снапшот (get_live_chart): замеряется само построение
+    cases['build_price_chart'] = lambda: app.build_price_chart(app.get_market_snapshot('SPX'))
+    cases['build_key_levels_chart'] = lambda: app.build_key_levels_chart(app.get_market_snapshot('SPX'))
+    # Живое обновление зрителя, у которого на графике нет последних 5 баров, при готовой фигуре снапшота
+    live_state = dict(app.get_live_chart('price', 'SPX').state)
+    live_state.update(created_at=0, bars=live_state['bars'] - 5,
+                      last_bar=app.get_live_chart('price', 'SPX').figure['data'][0]['x'][live_state['bars'] - 6])
+    cases['live_chart_update[5 bars]'] = lambda: app.live_chart_update('price', live_state)
+    cases['update_forecast'] = lambda: app.update_forecast(1, None, 'SPX')
+    cases['get_pc_ratio_data'] = app.get_pc_ratio_data
+
+    results = {}
+    for name, callback in cases.items():
+        # Первый прогон - прогрев (фикстуры в памяти, снапшоты в кэше)
+        callback()
+        samples = {stage: [] for stage in STAGES + ['total']}
+        payload_size = 0
+        for _ in range(args.repeats):
+            if args.cold:
+                app.cache.clear()
+            if name in resets:
+                resets[name]()
+            app.start_stage_timing()
+            start = time.perf_counter()
+            response = callback()
+            callback_seconds = time.perf_counter() - start
+            timings = app.stop_stage_timing()
+
+            start = time.perf_counter()
+            payload = to_json(response)
+            json_seconds = time.perf_counter() - start
+            payload_size = len(payload)
+
+            for stage in ['fetch', 'pandas', 'figure']:
+                samples[stage].append(timings.get(stage, 0.0))
+            samples['json'].append(json_seconds)
+            samples['other'].append(max(callback_seconds - sum(timings.values()), 0.0))
+            samples['total'].append(callback_seconds + json_seconds)
+
+        results[name] = {stage: percentiles(values) for stage, values in samples.items()}
+        results[name]['payload_bytes'] = payload_size
+
+    report = {
+        'git_revision': git_revision(),
+        'created_at': pd.Timestamp.now(tz='UTC').isoformat(),
+        'python': platform.python_version(),
+        'fixtures': 'synthetic' if args.fixtures is None else os.path.abspath(args.fixtures),
+        'strikes_per_expiration': args.strikes if args.fixtures is None else None,
+        'cold': args.cold,
+        'repeats': args.repeats,
+        'results': results,
+    }
+
+    print(f"Ревизия {report['git_revision']}, прогонов: {args.repeats}, {'холодный' if args.cold else 'теплый'} кэш")
+    print(f"{'колбэк':<36}" + ''.join(f"{stage:>16}" for stage in STAGES + ['total']) + f"{'байт':>10}")
+    for name, result in results.items():
+        cells = ''.join(f"{result[stage]['p50_ms']:>7.1f}/{result[stage]['p95_ms']:<8.1f}" for stage in STAGES + ['total'])
+        print(f"{name:<36}{cells}{result['payload_bytes']:>10}")
+    print("Время в мс: p50/p95")
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2, ensure_ascii=False)
+        print(f"Результаты сохранены в {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+# Бенчмарк формата кэша цепочек: pickle DataFrame (как раньше) против компактного chain_format.
+# Запуск из корня репозитория: python benchmarks/bench_chain_format.py --strikes 5000
+import argparse
+import os
+import pickle
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from chain_format import cast_chain, decode_chain, decode_chain_arrays, encode_chain
+
+
+# Синтетическая цепочка в том виде, как ее раньше кэшировал get_option_data (float64 после merge)
+def make_chain(strike_count, rng):
+    strikes = np.round(np.linspace(2900, 8700, strike_count), 1)
+    return pd.DataFrame({
+        'strike': strikes,
+        'Call OI': rng.integers(0, 20000, strike_count).astype(float),
+        'Call Volume': rng.integers(0, 10000, strike_count).astype(float),
+        'Call IV': rng.uniform(0.08, 0.6, strike_count),
+        'Put OI': rng.integers(0, 20000, strike_count).astype(float),
+        'Put Volume': rng.integers(0, 10000, strike_count).astype(float),
+        'Put IV': rng.uniform(0.08, 0.6, strike_count),
+    })
+
+
+def measure(function, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1_000_000)
+    return np.percentile(timings, 50)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--strikes', type=int, default=5000)
+    parser.add_argument('--repeats', type=int, default=200)
+    args = parser.parse_args()
+
+    chain = make_chain(args.strikes, np.random.default_rng(42))
+    pickled = pickle.dumps(chain, pickle.HIGHEST_PROTOCOL)
+    encoded = encode_chain(cast_chain(chain))
+
+    print(f"Страйков: {args.strikes}")
+    print(f"pickle DataFrame: {len(pickled):>9,} байт, загрузка "
+          f"{measure(lambda: pickle.loads(pickled), args.repeats):8.1f} мкс")
+    print(f"chain_format:     {len(encoded):>9,} байт, массивы "
+          f"{measure(lambda: decode_chain_arrays(encoded), args.repeats):8.1f} мкс, DataFrame "
+          f"{measure(lambda: decode_chain(encoded), args.repeats):8.1f} мкс")
+
+
+if __name__ == '__main__':
+    main()
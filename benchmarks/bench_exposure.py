@@ -0,0 +1,71 @@
+# Бенчмарк расчета гамма-экспозиции (Net GEX / AG) по всем страйкам и экспирациям.
+# Запуск из корня репозитория: python benchmarks/bench_exposure.py --expirations 60 --strikes 3000
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Настройки окружения должны быть заданы до импорта app: импорт не трогает рабочий кэш и историю снапшотов
+os.environ.update({
+    'CACHE_DIR': os.path.join(tempfile.mkdtemp(prefix='bench-exposure-'), 'cache'),
+    'PREFETCH_ENABLED': '0',
+    'SNAPSHOT_STORE_ENABLED': '0',
+    'WARM_RESTART': '0',
+})
+
+import numpy as np
+import pandas as pd
+
+import app
+from chain_format import cast_chain
+
+
+# Синтетическая цепочка одной экспирации в формате fetch_expiration_chain
+def make_chain(strikes, rng):
+    size = len(strikes)
+    return cast_chain(pd.DataFrame({
+        'strike': strikes,
+        'Call OI': rng.integers(0, 20000, size).astype(float),
+        'Call Volume': rng.integers(0, 10000, size).astype(float),
+        'Call IV': rng.uniform(0.08, 0.6, size),
+        'Put OI': rng.integers(0, 20000, size).astype(float),
+        'Put Volume': rng.integers(0, 10000, size).astype(float),
+        'Put IV': rng.uniform(0.08, 0.6, size),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--expirations', type=int, default=60)
+    parser.add_argument('--strikes', type=int, default=3000)
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--spot', type=float, default=5800.0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    today = pd.Timestamp.now(tz='America/New_York').normalize()
+    expirations = [str((today + pd.Timedelta(days=day)).date()) for day in range(args.expirations)]
+    strikes = np.round(np.linspace(args.spot * 0.5, args.spot * 1.5, args.strikes), 1)
+    chains = [make_chain(strikes, rng) for _ in expirations]
+
+    # Первый прогон - прогрев
+    app.build_exposure_data(expirations, chains, args.spot)
+
+    timings = []
+    for repeat in range(args.repeats):
+        # Каждый прогон - новая цена, как при обновлении спота
+        spot_price = args.spot * (1 + 0.0005 * repeat)
+        start = time.perf_counter()
+        app.build_exposure_data(expirations, chains, spot_price)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    print(f"Экспираций: {args.expirations}, страйков на экспирацию: {args.strikes}, "
+          f"контрактов: {args.expirations * args.strikes * 2}")
+    print(f"Пересчет экспозиции: p50 {np.percentile(timings, 50):.1f} ms, "
+          f"p95 {np.percentile(timings, 95):.1f} ms, max {max(timings):.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+# Бенчмарк расчета ключевых уровней: прежний способ (фильтр DataFrame и idxmax на каждый уровень,
+# как в колбэках до key_levels.py) против движка key_levels (searchsorted + один argmax по матрице),
+# и сумм метрик окна: булевы маски и sum() против разности префиксных сумм (window_sums).
+# Цепочки синтетические, с фиксированным seed, размером от 10 тысяч страйков.
+# Запуск из корня репозитория:
+#   python benchmarks/bench_levels.py --strikes 10000,50000,200000 --output bench-levels.json
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import pandas as pd
+
+from key_levels import LEVEL_METRICS, MAX_LEVELS, build_level_index, compute_key_levels, window_sums
+
+SPOT = 5800.0
+
+
+def synthetic_chain(strike_count, seed=7):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'strike': np.round(np.linspace(SPOT * 0.5, SPOT * 1.5, strike_count), 2),
+        'Call OI': rng.integers(0, 20000, strike_count),
+        'Call Volume': rng.integers(0, 10000, strike_count),
+        'Put OI': rng.integers(0, 20000, strike_count),
+        'Put Volume': rng.integers(0, 10000, strike_count),
+        'Net GEX': np.round(rng.normal(0, 1e6, strike_count), 1),
+        'AG': np.round(rng.uniform(0, 2e6, strike_count), 1),
+    })
+
+
+# Набор уровней одного колбэка ключевых уровней прежним способом: окно графика,
+# окна +-1% от цены и уровни выше/ниже цены
+def pandas_levels(options_data, lower, upper, spot):
+    options_data = options_data[(options_data['strike'] >= lower) & (options_data['strike'] <= upper)]
+    levels = {name: options_data.loc[options_data[column].idxmax(), 'strike']
+              for column, name in zip(LEVEL_METRICS, MAX_LEVELS)}
+    levels['min_net_gex'] = options_data.loc[options_data['Net GEX'].idxmin(), 'strike']
+
+    near_above = options_data[(options_data['strike'] >= spot) & (options_data['strike'] <= spot * 1.01)]
+    levels['main_resistance'] = near_above.loc[near_above['Call Volume'].idxmax(), 'strike']
+    near_below = options_data[(options_data['strike'] <= spot) & (options_data['strike'] >= spot * 0.99)]
+    levels['main_support'] = near_below.loc[near_below['Put Volume'].idxmax(), 'strike']
+
+    above = options_data[options_data['strike'] > spot]
+    below = options_data[options_data['strike'] < spot]
+    levels['above_max_ag'] = above.loc[above['AG'].idxmax(), 'strike']
+    levels['below_max_ag'] = below.loc[below['AG'].idxmax(), 'strike']
+    positive = above[above['Net GEX'] > 0]
+    levels['above_positive_net_gex'] = positive.loc[positive['Net GEX'].idxmax(), 'strike']
+    negative = below[below['Net GEX'] < 0]
+    levels['below_negative_net_gex'] = negative.loc[negative['Net GEX'].idxmin(), 'strike']
+    return levels
+
+
+def engine_levels(index, lower, upper, spot):
+    levels = compute_key_levels(index, lower, upper, spot)
+    result = {name: levels[name] for name in MAX_LEVELS + ['min_net_gex']}
+    result['main_resistance'] = compute_key_levels(index, spot, spot * 1.01)['max_call_volume']
+    result['main_support'] = compute_key_levels(index, spot * 0.99, spot)['max_put_volume']
+    result['above_max_ag'] = levels['above']['max_ag']
+    result['below_max_ag'] = levels['below']['max_ag']
+    result['above_positive_net_gex'] = levels['above']['positive_net_gex']
+    result['below_negative_net_gex'] = levels['below']['negative_net_gex']
+    return result
+
+
+# Суммы окна прежним способом (прогноз, P/C Ratio): маска по цепочке и sum() по колонкам
+def pandas_sums(options_data, lower, upper):
+    window = options_data[(options_data['strike'] >= lower) & (options_data['strike'] <= upper)]
+    return {column: float(window[column].sum()) for column in LEVEL_METRICS}
+
+
+def engine_sums(index, lower, upper):
+    sums = window_sums(index, lower, upper)
+    return {column: sums[column] for column in LEVEL_METRICS}
+
+
+def measure(function, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return {'p50_ms': round(float(np.percentile(samples, 50)) * 1000, 4),
+            'p95_ms': round(float(np.percentile(samples, 95)) * 1000, 4)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--strikes', default='10000,50000,200000', help='размеры цепочек через запятую')
+    parser.add_argument('--repeats', type=int, default=50)
+    parser.add_argument('--output', help='файл для результатов в JSON')
+    args = parser.parse_args()
+
+    lower, upper = SPOT * 0.9775, SPOT * 1.0225
+    results = {}
+    for strike_count in map(int, args.strikes.split(',')):
+        options_data = synthetic_chain(strike_count)
+        index = build_level_index(options_data)
+
+        # Оба способа должны давать одни и те же страйки
+        expected = pandas_levels(options_data, lower, upper, SPOT)
+        actual = engine_levels(index, lower, upper, SPOT)
+        if expected != actual:
+            raise AssertionError(f"Уровни расходятся на {strike_count} страйках: {expected} != {actual}")
+        expected = pandas_sums(options_data, lower, upper)
+        actual = engine_sums(index, lower, upper)
+        if not all(np.isclose(expected[column], actual[column], rtol=1e-9) for column in LEVEL_METRICS):
+            raise AssertionError(f"Суммы окна расходятся на {strike_count} страйках: {expected} != {actual}")
+
+        results[strike_count] = {
+            'pandas': measure(lambda: pandas_levels(options_data, lower, upper, SPOT), args.repeats),
+            'index_build': measure(lambda: build_level_index(options_data), args.repeats),
+            'engine': measure(lambda: engine_levels(index, lower, upper, SPOT), args.repeats),
+            'pandas_sums': measure(lambda: pandas_sums(options_data, lower, upper), args.repeats),
+            'engine_sums': measure(lambda: engine_sums(index, lower, upper), args.repeats),
+        }
+
+    print(f"Python {platform.python_version()}, прогонов: {args.repeats}")
+    print(f"{'страйков':>10}{'pandas':>20}{'матрица':>20}{'движок':>20}{'ускорение':>12}")
+    for strike_count, result in results.items():
+        cells = ''.join(f"{result[name]['p50_ms']:>9.3f}/{result[name]['p95_ms']:<10.3f}"
+                        for name in ['pandas', 'index_build', 'engine'])
+        speedup = result['pandas']['p50_ms'] / max(result['engine']['p50_ms'], 1e-6)
+        print(f"{strike_count:>10}{cells}{speedup:>11.0f}x")
+    print(f"{'страйков':>10}{'суммы pandas':>20}{'суммы движок':>20}{'ускорение':>12}")
+    for strike_count, result in results.items():
+        cells = ''.join(f"{result[name]['p50_ms']:>9.3f}/{result[name]['p95_ms']:<10.3f}"
+                        for name in ['pandas_sums', 'engine_sums'])
+        speedup = result['pandas_sums']['p50_ms'] / max(result['engine_sums']['p50_ms'], 1e-6)
+        print(f"{strike_count:>10}{cells}{speedup:>11.0f}x")
+    print("Время в мс: p50/p95. Матрица и префиксные суммы строятся один раз на снапшот (в колонке 'матрица'), "
+          "уровни окна кэшируются (get_key_levels)")
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'python': platform.python_version(), 'repeats': args.repeats, 'results': results},
+                      file, indent=2, ensure_ascii=False)
+        print(f"Результаты сохранены в {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+# Байты на проводе за одну загрузку страницы: HTML, JS/CSS, лейаут и зависимости Dash и колбэки
+# страницы (вход, открытие страницы, поиск SPX). Каждая загрузка - новый клиент без кэша браузера,
+# по очереди с Accept-Encoding identity, gzip и br. Сырой размер - тело после распаковки,
+# на проводе - Content-Length ответа. Без --url поднимает приложение локально, как loadtest.py.
+# Запуск из корня репозитория:
+#   python benchmarks/bench_wire.py --output bench-wire.json
+import argparse
+import json
+import re
+import tempfile
+
+from loadtest import DashClient, dependency_key, session_steps, start_local_app, wait_for_server
+from bench_callbacks import git_revision
+
+import requests
+
+# Шаги сессии loadtest.py, которые выполняет страница после входа и открытия
+PAGE_STEPS = {
+    '/': ['search'],
+    '/key-levels': ['key levels'],
+    '/options-summary': ['p/c ratio'],
+}
+
+# Чанки, которые dash-renderer догружает сам (их нет в HTML): графики, выпадающий список и plotly.js
+ASYNC_RESOURCES = [
+    '/_dash-component-suites/dash/dcc/async-graph.js',
+    '/_dash-component-suites/dash/dcc/async-dropdown.js',
+    '/_dash-component-suites/plotly/package_data/plotly.min.js',
+]
+
+KINDS = ['static', 'dash', 'callbacks']
+
+
+def response_kind(url):
+    if '/_dash-update-component' in url:
+        return 'callbacks'
+    if '/_dash-layout' in url or '/_dash-dependencies' in url:
+        return 'dash'
+    return 'static'
+
+
+# Одна загрузка страницы новым клиентом: {вид ответа: [запросов, сырых байт, байт на проводе]}
+def load_page(base_url, dependencies, pathname, encoding, username):
+    client = DashClient(base_url, dependencies)
+    client.session.headers['Accept-Encoding'] = encoding
+    totals = {kind: [0, 0, 0] for kind in KINDS}
+
+    def record(response, *args, **kwargs):
+        total = totals[response_kind(response.url)]
+        total[0] += 1
+        total[1] += len(response.content)
+        total[2] += int(response.headers.get('Content-Length', len(response.content)))
+
+    client.session.hooks['response'].append(record)
+
+    html = client.get('/').text
+    for path in re.findall(r'(?:src|href)="(/[^"]+)"', html) + ASYNC_RESOURCES:
+        client.get(path)
+    client.get('/_dash-layout')
+    client.get('/_dash-dependencies')
+
+    steps = dict(session_steps(client, 'SPX', username))
+    for name in ['login', f'page {pathname}'] + PAGE_STEPS[pathname]:
+        steps[name]()
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', help='адрес уже запущенного приложения (по умолчанию - запуск локально)')
+    parser.add_argument('--server-command', help='команда запуска приложения вместо "python app.py"')
+    parser.add_argument('--port', type=int, default=8050)
+    parser.add_argument('--pages', default=','.join(PAGE_STEPS), help='страницы через запятую')
+    parser.add_argument('--encodings', default='identity,gzip,br', help='значения Accept-Encoding через запятую')
+    parser.add_argument('--username', default='313', help='пользователь из ALLOWED_USERS')
+    parser.add_argument('--fixtures', help='каталог записанных фикстур (по умолчанию - синтетические)')
+    parser.add_argument('--synthetic-expirations', type=int, default=60)
+    parser.add_argument('--strikes', type=int, default=400)
+    parser.add_argument('--output', help='файл для результатов в JSON')
+    args = parser.parse_args()
+    # Для start_local_app: только SPX, без задержки провайдера
+    args.tickers, args.latency_ms = 'SPX', 0
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        server = start_local_app(args, tempfile.mkdtemp(prefix='bench-wire-'))
+        base_url = f"http://127.0.0.1:{args.port}"
+
+    try:
+        wait_for_server(base_url, wait_ready=True)
+        dependencies = {dependency_key(dependency['output']): dependency
+                        for dependency in requests.get(base_url + '/_dash-dependencies', timeout=30).json()}
+        encodings = args.encodings.split(',')
+        results = {pathname: {encoding: load_page(base_url, dependencies, pathname, encoding, args.username)
+                              for encoding in encodings}
+                   for pathname in args.pages.split(',')}
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    print(f"{'страница':<18}{'ответы':<11}{'запросов':>9}{'сырые КБ':>10}"
+          + ''.join(f"{encoding + ' КБ':>12}" for encoding in encodings))
+    for pathname, by_encoding in results.items():
+        for kind in KINDS + ['total']:
+            rows = {encoding: ([sum(totals[k][i] for k in KINDS) for i in range(3)] if kind == 'total'
+                               else totals[kind])
+                    for encoding, totals in by_encoding.items()}
+            first = rows[encodings[0]]
+            print(f"{pathname:<18}{kind:<11}{first[0]:>9}{first[1] / 1024:>10.1f}"
+                  + ''.join(f"{rows[encoding][2] / 1024:>12.1f}" for encoding in encodings))
+    print("Сырые КБ - после распаковки, остальные колонки - на проводе. JS/CSS (static) браузер потом берет из кэша")
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'git_revision': git_revision(), 'url': base_url, 'args': vars(args), 'results': results},
+                      file, indent=2, ensure_ascii=False)
+        print(f"Результаты сохранены в {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,306 @@
+# Нагрузочный тест: N виртуальных пользователей проходят типичную сессию через /_dash-update-component
+# (вход, главная страница с поиском SPX, переключение дат и параметров, живое обновление графиков,
+# Key Levels, P/C Ratio).
+# Без --url поднимает приложение локально на офлайн-провайдере replay с синтетическими фикстурами.
+# Запуск из корня репозитория: python benchmarks/loadtest.py --users 1,5,10,25,50 --duration 30
+import argparse
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import requests
+
+from bench_callbacks import write_synthetic_fixtures, git_revision
+
+
+# Разбор строки выхода зависимости Dash: "id.prop" или "..id1.prop1...id2.prop2.."
+def parse_outputs(output):
+    multi = output.startswith('..')
+    parts = output[2:-2].split('...') if multi else [output]
+    outputs = []
+    for part in parts:
+        component_id, component_property = part.rsplit('.', 1)
+        outputs.append({'id': component_id, 'property': component_property})
+    return outputs, multi
+
+
+# Ключ зависимости по выходу: к свойствам выходов с allow_duplicate Dash добавляет '@<хэш>'
+def dependency_key(output):
+    return re.sub(r'@[0-9a-f]+', '', output)
+
+
+# Клиент одного пользователя: собирает тела запросов по /_dash-dependencies, как dash-renderer
+class DashClient:
+    def __init__(self, base_url, dependencies):
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+        self.dependencies = dependencies
+        self.values = {}
+
+    def get(self, path):
+        response = self.session.get(self.base_url + path, timeout=60)
+        response.raise_for_status()
+        return response
+
+    def callback(self, output, changed):
+        dependency = self.dependencies[output]
+        outputs, multi = parse_outputs(dependency['output'])
+
+        def with_value(item):
+            return {'id': item['id'], 'property': item['property'],
+                    'value': self.values.get(f"{item['id']}.{item['property']}")}
+
+        body = {
+            'output': dependency['output'],
+            'outputs': outputs if multi else outputs[0],
+            'inputs': [with_value(item) for item in dependency['inputs']],
+            'state': [with_value(item) for item in dependency.get('state', [])],
+            'changedPropIds': changed,
+        }
+        response = self.session.post(self.base_url + '/_dash-update-component', json=body, timeout=60)
+        # 204 - колбэк отменил обновление (PreventUpdate)
+        if response.status_code == 204:
+            return {}
+        response.raise_for_status()
+        updates = response.json().get('response', {})
+        for component_id, props in updates.items():
+            for component_property, value in props.items():
+                self.values[f"{component_id}.{component_property}"] = value
+        return updates
+
+
+# Сценарий сессии: список шагов (имя, функция клиента). Ошибка шага не прерывает сессию.
+def session_steps(client, ticker, username):
+    def login():
+        client.values.update({'submit-button.n_clicks': 1, 'username-input.value': username})
+        client.callback('..access-message.children...main-content.style...login-container.style...'
+                        'username-store.data...auth-status.data..', ['submit-button.n_clicks'])
+
+    def open_page(pathname):
+        def step():
+            client.values.update({'url.pathname': pathname, 'url.search': ''})
+            client.callback('page-content.children', ['url.pathname'])
+        return step
+
+    def search():
+        clicks = (client.values.get('search-button.n_clicks') or 0) + 1
+        client.values.update({'search-button.n_clicks': clicks, 'ticker-input.value': ticker,
+                              'selected-params.data': client.values.get('selected-params.data') or ['Net GEX']})
+        client.callback('..date-dropdown.options...date-dropdown.value..', ['search-button.n_clicks'])
+        client.callback('..price-chart.figure...price-chart-live.data..', ['search-button.n_clicks'])
+        client.callback('..price-chart-simplified.figure...price-chart-simplified-live.data..',
+                        ['search-button.n_clicks'])
+        client.callback('options-data-store.data', ['search-button.n_clicks'])
+
+    def toggle_dates():
+        options = client.values.get('date-dropdown.options') or []
+        dates = [option['value'] for option in options[:random.randint(1, 4)]]
+        client.values['date-dropdown.value'] = dates
+        client.callback('options-data-store.data', ['date-dropdown.value'])
+
+    def toggle_parameter():
+        button = random.choice(['btn-ag', 'btn-call-oi', 'btn-put-oi', 'btn-call-vol', 'btn-put-vol'])
+        client.values[f"{button}.n_clicks"] = (client.values.get(f"{button}.n_clicks") or 0) + 1
+        client.callback('..selected-params.data...btn-net-gex.className...btn-ag.className...btn-call-oi.className...'
+                        'btn-put-oi.className...btn-call-vol.className...btn-put-vol.className..',
+                        [f"{button}.n_clicks"])
+
+    # Проверка нового снапшота открытой главной страницей (dcc.Interval live-interval)
+    def live_update():
+        client.values['live-interval.n_intervals'] = (client.values.get('live-interval.n_intervals') or 0) + 1
+        client.callback('..price-chart.figure...price-chart-live.data...'
+                        'price-chart-simplified.figure...price-chart-simplified-live.data..',
+                        ['live-interval.n_intervals'])
+
+    def key_levels():
+        client.values.update({'search-button-key-levels.n_clicks': 1, 'ticker-input-key-levels.value': ticker})
+        client.callback('..key-levels-chart.figure...key-levels-chart-live.data..',
+                        ['search-button-key-levels.n_clicks'])
+        client.callback('forecast-text.children', ['search-button-key-levels.n_clicks'])
+
+    def pc_ratio():
+        client.values['summary-interval.n_intervals'] = 0
+        client.callback('options-summary-table.data', ['url.pathname'])
+
+    def index():
+        client.get('/')
+        client.get('/_dash-layout')
+
+    return [
+        ('index', index),
+        ('login', login),
+        ('page /', open_page('/')),
+        ('search', search),
+        ('toggle dates', toggle_dates),
+        ('toggle parameter', toggle_parameter),
+        ('toggle dates', toggle_dates),
+        ('live update', live_update),
+        ('page /key-levels', open_page('/key-levels')),
+        ('key levels', key_levels),
+        ('page /options-summary', open_page('/options-summary')),
+        ('p/c ratio', pc_ratio),
+    ]
+
+
+def virtual_user(base_url, dependencies, args, stop, samples):
+    while not stop.is_set():
+        client = DashClient(base_url, dependencies)
+        for name, step in session_steps(client, random.choice(args.tickers.split(',')), args.username):
+            if stop.is_set():
+                return
+            start = time.perf_counter()
+            try:
+                step()
+                samples.append((name, time.perf_counter() - start, None))
+            except Exception as e:
+                samples.append((name, time.perf_counter() - start, f"{type(e).__name__}: {e}"))
+            if args.think_time:
+                time.sleep(random.uniform(0, 2 * args.think_time))
+        samples.append(('session', 0.0, None))
+
+
+# Локальный запуск приложения на офлайн-провайдере (replay) с синтетическими фикстурами
+def start_local_app(args, work_dir):
+    # Окружение приложения - исходное, без настроек генерации фикстур в этом процессе
+    environment = dict(os.environ)
+    fixtures = args.fixtures
+    if fixtures is None:
+        fixtures = os.path.join(work_dir, 'fixtures')
+        os.environ.update({'MARKET_DATA_PROVIDER': 'replay', 'MARKET_DATA_FIXTURES': fixtures,
+                           'PREFETCH_ENABLED': '0', 'CACHE_DIR': os.path.join(work_dir, 'bootstrap-cache')})
+        import app
+        tickers = list(dict.fromkeys(['^SPX'] + [app.normalize_ticker(ticker) for ticker in app.PC_RATIO_TICKERS]
+                                     + [app.normalize_ticker(ticker) for ticker in args.tickers.split(',')]))
+        write_synthetic_fixtures(fixtures, tickers, args.synthetic_expirations, args.strikes)
+
+    environment.update(PORT=str(args.port),
+                       MARKET_DATA_PROVIDER='replay',
+                       MARKET_DATA_FIXTURES=fixtures,
+                       MARKET_DATA_LATENCY_MS=str(args.latency_ms),
+                       CACHE_DIR=os.path.join(work_dir, 'cache'),
+                       SNAPSHOT_STORE_ENABLED='0',
+                       WARM_RESTART='0')
+    command = args.server_command.split() if args.server_command else [sys.executable, 'app.py']
+    log = open(os.path.join(work_dir, 'server.log'), 'w')
+    server = subprocess.Popen(command, cwd=ROOT, env=environment, stdout=log, stderr=subprocess.STDOUT)
+    print(f"Приложение запущено (pid {server.pid}), лог: {log.name}")
+    return server
+
+
+def wait_for_server(base_url, wait_ready, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            status = requests.get(base_url + '/ready', timeout=5).status_code
+            if status == 200 or (status == 503 and not wait_ready):
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"Приложение не ответило за {timeout} с")
+
+
+def run_level(base_url, dependencies, args, users):
+    samples = []
+    stop = threading.Event()
+    threads = [threading.Thread(target=virtual_user, args=(base_url, dependencies, args, stop, samples), daemon=True)
+               for _ in range(users)]
+    started_at = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started_at
+
+    requests_done = [(name, seconds, error) for name, seconds, error in samples if name != 'session']
+    latencies = np.array([seconds for _, seconds, error in requests_done if error is None]) * 1000
+    errors = [error for _, _, error in requests_done if error is not None]
+    steps = {}
+    for name, seconds, error in requests_done:
+        if error is None:
+            steps.setdefault(name, []).append(seconds * 1000)
+
+    def percentile(values, q):
+        return round(float(np.percentile(values, q)), 1) if len(values) else None
+
+    return {
+        'users': users,
+        'duration_seconds': round(elapsed, 1),
+        'sessions': sum(1 for name, _, _ in samples if name == 'session'),
+        'steps': len(requests_done),
+        'steps_per_second': round(len(requests_done) / elapsed, 2),
+        'error_rate': round(len(errors) / len(requests_done), 4) if requests_done else 0.0,
+        'errors_sample': sorted(set(errors))[:5],
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99),
+        'max_ms': round(float(latencies.max()), 1) if len(latencies) else None,
+        'steps_p95_ms': {name: percentile(values, 95) for name, values in sorted(steps.items())},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', help='адрес уже запущенного приложения (по умолчанию - запуск локально)')
+    parser.add_argument('--server-command', help='команда запуска приложения вместо "python app.py"')
+    parser.add_argument('--port', type=int, default=8050)
+    parser.add_argument('--users', default='1,5,10,25', help='уровни числа пользователей через запятую')
+    parser.add_argument('--duration', type=float, default=30, help='секунд на каждый уровень')
+    parser.add_argument('--think-time', type=float, default=0.0, help='средняя пауза между шагами (с)')
+    parser.add_argument('--tickers', default='SPX')
+    parser.add_argument('--username', default='313', help='пользователь из ALLOWED_USERS')
+    parser.add_argument('--fixtures', help='каталог записанных фикстур (по умолчанию - синтетические)')
+    parser.add_argument('--synthetic-expirations', type=int, default=60)
+    parser.add_argument('--strikes', type=int, default=400)
+    parser.add_argument('--latency-ms', type=float, default=50, help='задержка офлайн-провайдера на запрос')
+    parser.add_argument('--cold-start', action='store_true', help='не ждать /ready (старт вместе с открытием рынка)')
+    parser.add_argument('--output', help='файл для результатов в JSON')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='loadtest-')
+    server = None
+    base_url = args.url
+    if base_url is None:
+        server = start_local_app(args, work_dir)
+        base_url = f"http://127.0.0.1:{args.port}"
+
+    try:
+        wait_for_server(base_url, wait_ready=not args.cold_start)
+        dependencies = {}
+        for dependency in requests.get(base_url + '/_dash-dependencies', timeout=30).json():
+            dependencies[dependency_key(dependency['output'])] = dependency
+
+        levels = [run_level(base_url, dependencies, args, int(users)) for users in args.users.split(',')]
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    print(f"{'польз.':>7}{'сессий':>8}{'шаг/с':>8}{'ошибки':>9}{'p50 мс':>9}{'p95 мс':>9}{'p99 мс':>9}{'max мс':>9}")
+    for level in levels:
+        print(f"{level['users']:>7}{level['sessions']:>8}{level['steps_per_second']:>8}{level['error_rate']:>9.2%}"
+              f"{level['p50_ms'] or 0:>9}{level['p95_ms'] or 0:>9}{level['p99_ms'] or 0:>9}{level['max_ms'] or 0:>9}")
+        for error in level['errors_sample']:
+            print(f"        {error}")
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'git_revision': git_revision(), 'url': base_url, 'args': vars(args), 'levels': levels},
+                      file, indent=2, ensure_ascii=False)
+        print(f"Результаты сохранены в {args.output}")
+
+
+if __name__ == '__main__':
+    main()
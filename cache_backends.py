@@ -0,0 +1,259 @@
+import hashlib
+import os
+import pickle
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from cachelib import FileSystemCache, RedisCache
+from flask_caching.backends.base import BaseCache
+from werkzeug.utils import import_string
+
+try:
+    import fcntl
+except ImportError:  # Windows: блокировок через файлы нет
+    fcntl = None
+
+# Снятие и продление блокировки Redis только ее владельцем (ключ мог истечь и достаться другому процессу)
+_REDIS_RELEASE_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+_REDIS_RENEW_SCRIPT = ("if redis.call('get', KEYS[1]) == ARGV[1] then "
+                       "return redis.call('pexpire', KEYS[1], ARGV[2]) end return 0")
+
+
+# Клиент Redis для блокировок между процессами - свой, по настройкам CACHE_REDIS_*
+# (клиент L2 - внутреннее поле cachelib)
+def redis_lock_client(config):
+    import redis
+    if config.get('CACHE_REDIS_URL'):
+        return redis.Redis.from_url(config['CACHE_REDIS_URL'])
+    return redis.Redis(host=config.get('CACHE_REDIS_HOST', 'localhost'), port=config.get('CACHE_REDIS_PORT', 6379),
+                       password=config.get('CACHE_REDIS_PASSWORD'), db=config.get('CACHE_REDIS_DB', 0))
+
+
+# Функция примерной оценки размера значения в памяти (байты)
+def estimate_size(value):
+    if value is None:
+        return 0
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value)
+    # DataFrame / Series
+    if hasattr(value, 'memory_usage'):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if hasattr(usage, 'sum') else usage)
+    # numpy-массивы
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    if isinstance(value, (tuple, list, set, frozenset)):
+        return 64 + sum(estimate_size(item) for item in value)
+    if isinstance(value, dict):
+        return 64 + sum(estimate_size(key) + estimate_size(item) for key, item in value.items())
+    try:
+        return len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+# Группа ключа для статистики: префикс до ":" (chain, snapshot, bars, ...)
+def key_group(key):
+    return key.split(':', 1)[0] if ':' in key else 'memoize'
+
+
+# Двухуровневый кэш: L1 - LRU в памяти процесса с ограничением по размеру,
+# L2 - общий кэш (по умолчанию файловый). Попадание в L1 обходится без диска и распаковки pickle.
+class TwoTierCache(BaseCache):
+    def __init__(self, l2, max_bytes=256 * 1024 * 1024, l2_read_timeout=30, default_timeout=300, lock_dir=None,
+                 redis_client=None, lock_prefix=''):
+        super().__init__(default_timeout=default_timeout)
+        self.l2 = l2
+        # Блокировки между процессами: каталог файлов (файловый L2) или клиент Redis (L2 в Redis)
+        self.lock_dir = lock_dir
+        self.redis_client = redis_client
+        self.lock_prefix = lock_prefix
+        self.max_bytes = max_bytes
+        # Сколько живет в L1 значение, прочитанное из L2 (его точный срок в L2 неизвестен)
+        self.l2_read_timeout = l2_read_timeout
+        self._entries = OrderedDict()  # key -> (expires_at, value, size)
+        self._total_bytes = 0
+        self._lock = threading.RLock()
+        self._stats = {}
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        l2_factory = import_string(config.get('CACHE_L2_TYPE', 'flask_caching.backends.FileSystemCache'))
+        l2 = l2_factory.factory(app, config, list(args), dict(kwargs))
+        lock_dir = redis_client = None
+        if isinstance(l2, FileSystemCache) and fcntl is not None:
+            lock_dir = config.get('CACHE_LOCK_DIR', f"{config['CACHE_DIR'].rstrip('/')}.locks")
+        elif isinstance(l2, RedisCache):
+            redis_client = redis_lock_client(config)
+        return cls(
+            l2,
+            max_bytes=config.get('CACHE_L1_MAX_BYTES', 256 * 1024 * 1024),
+            l2_read_timeout=config.get('CACHE_L1_READ_TIMEOUT', 30),
+            default_timeout=kwargs.get('default_timeout', 300),
+            lock_dir=lock_dir,
+            redis_client=redis_client,
+            lock_prefix=f"{config.get('CACHE_KEY_PREFIX') or ''}lock:",
+        )
+
+    def _count(self, key, counter):
+        group = self._stats.setdefault(key_group(key), {'l1_hits': 0, 'l2_hits': 0, 'misses': 0})
+        group[counter] += 1
+
+    def _expires_at(self, timeout):
+        timeout = self._normalize_timeout(timeout)
+        return None if timeout == 0 else time.time() + timeout
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry[2]
+
+    def _put(self, key, value, expires_at):
+        size = estimate_size(value)
+        with self._lock:
+            self._remove(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (expires_at, value, size)
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_size
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value, _ = entry
+                if expires_at is None or expires_at > time.time():
+                    self._entries.move_to_end(key)
+                    self._count(key, 'l1_hits')
+                    return value
+                self._remove(key)
+
+        value = self.l2.get(key)
+        with self._lock:
+            self._count(key, 'misses' if value is None else 'l2_hits')
+        if value is not None:
+            self._put(key, value, self._expires_at(self.l2_read_timeout))
+        return value
+
+    # Чтение из L2 мимо L1: значение, которое мог обновить другой процесс, заменяет копию в L1
+    def reload(self, key):
+        value = self.l2.get(key)
+        with self._lock:
+            self._count(key, 'misses' if value is None else 'l2_hits')
+            if value is None:
+                self._remove(key)
+        if value is not None:
+            self._put(key, value, self._expires_at(self.l2_read_timeout))
+        return value
+
+    def set(self, key, value, timeout=None):
+        self._put(key, value, self._expires_at(timeout))
+        return self.l2.set(key, value, timeout=timeout)
+
+    def add(self, key, value, timeout=None):
+        added = self.l2.add(key, value, timeout=timeout)
+        if added:
+            self._put(key, value, self._expires_at(timeout))
+        return added
+
+    def delete(self, key):
+        with self._lock:
+            self._remove(key)
+        return self.l2.delete(key)
+
+    def has(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[0] is None or entry[0] > time.time()):
+                return True
+        return self.l2.has(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+        return self.l2.clear()
+
+    # Блокировка ключа между процессами: владелец - токен для release_lock, None - блокировку держит
+    # другой процесс. Файловый L2 - flock на файле в lock_dir (снимается системой, если процесс-владелец
+    # убит), Redis - SET NX PX на timeout, который продлевается, пока блокировка держится
+    # (истекает, только если владелец убит). Для остальных L2 - add, он не атомарен.
+    def acquire_lock(self, key, timeout):
+        if self.lock_dir is not None:
+            return self._acquire_file_lock(key)
+        if self.redis_client is not None:
+            return self._acquire_redis_lock(key, timeout)
+        return True if self.l2.add(key, os.getpid(), timeout=timeout) else None
+
+    def release_lock(self, key, token):
+        if self.lock_dir is not None:
+            path, descriptor = token
+            # Файл удаляется под блокировкой: ожидающие проверяют, что заблокировали тот же файл
+            os.unlink(path)
+            os.close(descriptor)
+        elif self.redis_client is not None:
+            value, stop = token
+            stop.set()
+            self.redis_client.eval(_REDIS_RELEASE_SCRIPT, 1, self.lock_prefix + key, value)
+        else:
+            self.l2.delete(key)
+
+    def _acquire_redis_lock(self, key, timeout):
+        lock_key = self.lock_prefix + key
+        value = uuid.uuid4().hex
+        if not self.redis_client.set(lock_key, value, nx=True, px=int(timeout * 1000)):
+            return None
+        stop = threading.Event()
+        threading.Thread(target=self._renew_redis_lock, args=(lock_key, value, timeout, stop), daemon=True,
+                         name=f"lock-renew:{key}").start()
+        return value, stop
+
+    # Продление блокировки Redis каждую треть timeout, пока она не снята (долгая загрузка многих дат)
+    def _renew_redis_lock(self, lock_key, value, timeout, stop):
+        while not stop.wait(timeout / 3):
+            try:
+                if not self.redis_client.eval(_REDIS_RENEW_SCRIPT, 1, lock_key, value, int(timeout * 1000)):
+                    return
+            except Exception as e:
+                print(f"Не удалось продлить блокировку {lock_key}: {e}")
+                return
+
+    def _lock_path(self, key):
+        return os.path.join(self.lock_dir, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.lock')
+
+    def _acquire_file_lock(self, key):
+        os.makedirs(self.lock_dir, exist_ok=True)
+        path = self._lock_path(key)
+        while True:
+            descriptor = os.open(path, os.O_CREAT | os.O_RDWR, 0o644)
+            try:
+                fcntl.flock(descriptor, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(descriptor)
+                return None
+            # Прежний владелец мог удалить файл, пока мы его открывали: тогда блокировка взята
+            # на удаленном файле, и нужно повторить с новым
+            try:
+                if os.stat(path).st_ino == os.fstat(descriptor).st_ino:
+                    return path, descriptor
+            except FileNotFoundError:
+                pass
+            os.close(descriptor)
+
+    # Статистика попаданий по группам ключей и заполненность L1
+    def stats(self):
+        with self._lock:
+            return {
+                'l1_entries': len(self._entries),
+                'l1_bytes': self._total_bytes,
+                'l1_max_bytes': self.max_bytes,
+                'groups': {group: dict(counters) for group, counters in self._stats.items()},
+            }
@@ -0,0 +1,84 @@
+import struct
+
+import numpy as np
+import pandas as pd
+
+# Компактный колоночный формат цепочки опционов одной даты экспирации.
+#
+# Заголовок: magic (4 байта) | версия (uint16) | число колонок (uint16) | число строк (uint32),
+# затем для каждой колонки: тип numpy (3 байта, например b'<f8') | длина имени (uint8) | имя (utf-8).
+# Далее данные колонок подряд, каждая колонка - непрерывный массив, выровненный на 8 байт.
+# Чтение не копирует данные: массивы создаются через np.frombuffer поверх байтов (из кэша или файла).
+# В памяти цепочка - словарь {колонка: numpy-массив}, без построения DataFrame на каждую дату.
+
+CHAIN_FORMAT_MAGIC = b'MPCH'
+CHAIN_FORMAT_VERSION = 1
+
+# Колонки цепочки и их типы: страйк в float64 (точное значение), IV в float32, OI и объем в int32
+CHAIN_COLUMN_DTYPES = [
+    ('strike', '<f8'),
+    ('Call OI', '<i4'),
+    ('Call Volume', '<i4'),
+    ('Call IV', '<f4'),
+    ('Put OI', '<i4'),
+    ('Put Volume', '<i4'),
+    ('Put IV', '<f4'),
+]
+
+_HEADER = struct.Struct('<4sHHI')
+_COLUMN = struct.Struct('<3sB')
+
+
+def _align(position):
+    return (position + 7) & ~7
+
+
+# Приведение цепочки из DataFrame к словарю массивов формата (пропуски OI/объема и IV - нули)
+def cast_chain(frame, column_dtypes=CHAIN_COLUMN_DTYPES):
+    return {name: frame[name].fillna(0).to_numpy().astype(dtype) for name, dtype in column_dtypes}
+
+
+# Функция кодирования цепочки (словаря массивов после cast_chain) в байты
+def encode_chain(chain, column_dtypes=CHAIN_COLUMN_DTYPES):
+    row_count = len(chain[column_dtypes[0][0]])
+    header = bytearray(_HEADER.pack(CHAIN_FORMAT_MAGIC, CHAIN_FORMAT_VERSION, len(column_dtypes), row_count))
+    for name, dtype in column_dtypes:
+        encoded_name = name.encode('utf-8')
+        header += _COLUMN.pack(dtype.encode('ascii'), len(encoded_name)) + encoded_name
+
+    parts = [bytes(header), b'\0' * (_align(len(header)) - len(header))]
+    for name, dtype in column_dtypes:
+        data = np.ascontiguousarray(chain[name], dtype=dtype).tobytes()
+        parts.append(data)
+        parts.append(b'\0' * (_align(len(data)) - len(data)))
+    return b''.join(parts)
+
+
+# Функция чтения массивов колонок без копирования (buffer - bytes или memoryview)
+def decode_chain_arrays(buffer):
+    view = memoryview(buffer)
+    magic, version, column_count, row_count = _HEADER.unpack_from(view, 0)
+    if magic != CHAIN_FORMAT_MAGIC or version != CHAIN_FORMAT_VERSION:
+        raise ValueError(f"Неизвестный формат цепочки: {magic!r} v{version}")
+
+    position = _HEADER.size
+    columns = []
+    for _ in range(column_count):
+        dtype, name_length = _COLUMN.unpack_from(view, position)
+        position += _COLUMN.size
+        name = bytes(view[position:position + name_length]).decode('utf-8')
+        position += name_length
+        columns.append((name, np.dtype(dtype.decode('ascii'))))
+
+    position = _align(position)
+    arrays = {}
+    for name, dtype in columns:
+        arrays[name] = np.frombuffer(view, dtype=dtype, count=row_count, offset=position)
+        position = _align(position + row_count * dtype.itemsize)
+    return arrays
+
+
+# Функция чтения цепочки в DataFrame (колонки ссылаются на исходный буфер, только для чтения)
+def decode_chain(buffer):
+    return pd.DataFrame(decode_chain_arrays(buffer), copy=False)
+
@@ -0,0 +1,24 @@
+# Настройки gunicorn для продакшена: gunicorn -c gunicorn.conf.py wsgi:server
+# Подбор числа воркеров и потоков - см. README.md (раздел "Запуск в продакшене")
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+
+# Процессы: построение графиков занимает GIL, поэтому параллельность по CPU дают только воркеры
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+
+# Потоки в воркере: пока один колбэк ждет Yahoo, другие потоки строят графики.
+# Каждый поток SSE живых обновлений (/live/<тикер>) занимает поток до закрытия страницы,
+# поэтому к потокам колбэков добавляются LIVE_MAX_STREAMS потоков (как в app.py)
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+if float(os.environ.get('LIVE_UPDATE_SECONDS', 5)) > 0:
+    threads += int(os.environ.get('LIVE_MAX_STREAMS', 64))
+
+# Колбэк с холодным кэшем ждет Yahoo до нескольких десятков секунд
+timeout = 120
+graceful_timeout = 30
+
+# Без preload: пулы потоков и планировщик прогрева создаются в каждом воркере после fork
+preload_app = False
@@ -0,0 +1,117 @@
+from collections import namedtuple
+
+import numpy as np
+
+# Движок ключевых уровней по цепочке опционов.
+#
+# Цепочка (options_data снапшота) отсортирована по страйку и не содержит повторов страйков,
+# поэтому окно страйков [lower, upper] находится двоичным поиском (np.searchsorted), а все уровни
+# окна - одним argmax/argmin по матрице метрик (строка - страйк, колонка - метрика), без фильтрации
+# DataFrame и отдельного idxmax на каждый уровень. При равных значениях берется первый (меньший)
+# страйк, как в idxmax. Суммы метрик окна - разность префиксных сумм на границах окна, за O(log n)
+# и без копирования строк цепочки.
+
+# Колонки матрицы метрик и имена уровней максимума по ним
+LEVEL_METRICS = ['Call Volume', 'Put Volume', 'Call OI', 'Put OI', 'Net GEX', 'AG']
+MAX_LEVELS = ['max_call_volume', 'max_put_volume', 'max_call_oi', 'max_put_oi', 'max_net_gex', 'max_ag']
+_NET_GEX = LEVEL_METRICS.index('Net GEX')
+
+# Все уровни окна. positive_net_gex / negative_net_gex - максимум / минимум Net GEX,
+# только если он положительный / отрицательный (иначе None). Пустое окно - все уровни None.
+LEVEL_NAMES = MAX_LEVELS + ['min_net_gex', 'positive_net_gex', 'negative_net_gex']
+
+# Отсортированные страйки, матрица метрик цепочки и ее префиксные суммы
+# (prefix_sums[i] - суммы метрик страйков до позиции i, первая строка - нули)
+LevelIndex = namedtuple('LevelIndex', ['strikes', 'values', 'prefix_sums'])
+
+
+def build_level_index(options_data):
+    values = options_data[LEVEL_METRICS].to_numpy(dtype=float)
+    prefix_sums = np.zeros((len(values) + 1, len(LEVEL_METRICS)))
+    np.cumsum(values, axis=0, out=prefix_sums[1:])
+    return LevelIndex(strikes=options_data['strike'].to_numpy(dtype=float), values=values, prefix_sums=prefix_sums)
+
+
+# Границы окна [lower, upper] (включительно) в позициях массива страйков; None - без границы
+def window_bounds(strikes, lower=None, upper=None):
+    start = 0 if lower is None else int(np.searchsorted(strikes, lower, side='left'))
+    stop = len(strikes) if upper is None else int(np.searchsorted(strikes, upper, side='right'))
+    return start, max(start, stop)
+
+
+# Суммы метрик (LEVEL_METRICS) по страйкам окна [lower, upper] и число страйков в окне ('strikes')
+def window_sums(index, lower=None, upper=None):
+    start, stop = window_bounds(index.strikes, lower, upper)
+    sums = dict(zip(LEVEL_METRICS, (index.prefix_sums[stop] - index.prefix_sums[start]).tolist()))
+    sums['strikes'] = stop - start
+    return sums
+
+
+def _levels_between(index, start, stop):
+    if start >= stop:
+        return dict.fromkeys(LEVEL_NAMES)
+
+    window = index.values[start:stop]
+    max_positions = window.argmax(axis=0)
+    min_position = window[:, _NET_GEX].argmin()
+    levels = dict(zip(MAX_LEVELS, index.strikes[start + max_positions]))
+    levels['min_net_gex'] = index.strikes[start + min_position]
+    levels['positive_net_gex'] = levels['max_net_gex'] if window[max_positions[_NET_GEX], _NET_GEX] > 0 else None
+    levels['negative_net_gex'] = levels['min_net_gex'] if window[min_position, _NET_GEX] < 0 else None
+    return levels
+
+
+# Уровни окна [lower, upper]. Если задан spot, добавляются уровни страйков строго ниже ('below')
+# и строго выше ('above') цены в пределах того же окна.
+def compute_key_levels(index, lower=None, upper=None, spot=None):
+    start, stop = window_bounds(index.strikes, lower, upper)
+    levels = _levels_between(index, start, stop)
+    if spot is not None:
+        spot_start, spot_stop = window_bounds(index.strikes, spot, spot)
+        levels['below'] = _levels_between(index, start, min(stop, spot_start))
+        levels['above'] = _levels_between(index, max(start, spot_stop), stop)
+    return levels
+
+
+# Зоны G-Flip: смена знака Net GEX, после которой run_length страйков подряд имеют новый знак.
+# direction='up' - отрицательный Net GEX, затем положительные, 'down' - наоборот.
+# positions - позиции страйка перед сменой знака (по возрастанию), strikes - их страйки,
+# zero_strikes - страйки нуля Net GEX (линейная интерполяция между страйком и следующим за ним).
+GammaFlips = namedtuple('GammaFlips', ['direction', 'run_length', 'positions', 'strikes', 'zero_strikes'])
+
+
+# Поиск всех зон G-Flip за O(n): число страйков нужного знака в окне (i, i + run_length]
+# считается разностью префиксных сумм, без вложенного цикла по окну
+def find_gamma_flips(index, run_length=6, direction='up'):
+    if run_length < 1:
+        raise ValueError(f"Длина G-Flip должна быть не меньше 1: {run_length}")
+    net_gex = index.values[:, _NET_GEX]
+    if direction == 'up':
+        before, after = net_gex < 0, net_gex > 0
+    elif direction == 'down':
+        before, after = net_gex > 0, net_gex < 0
+    else:
+        raise ValueError(f"Неизвестное направление G-Flip: {direction}")
+
+    last = len(net_gex) - run_length
+    if last <= 0:
+        positions = np.empty(0, dtype=np.intp)
+    else:
+        counts = np.concatenate(([0], np.cumsum(after)))
+        run_counts = counts[run_length + 1:run_length + 1 + last] - counts[1:1 + last]
+        positions = np.flatnonzero(before[:last] & (run_counts == run_length))
+
+    left, right = net_gex[positions], net_gex[positions + 1]
+    strikes = index.strikes[positions]
+    zero_strikes = strikes + (index.strikes[positions + 1] - strikes) * left / (left - right)
+    return GammaFlips(direction, run_length, positions, strikes, zero_strikes)
+
+
+# Первая зона G-Flip, целиком (вместе с run_length страйков после нее) лежащая в окне [lower, upper]:
+# (страйк, страйк нуля Net GEX) или (None, None)
+def first_gamma_flip(index, flips, lower=None, upper=None):
+    start, stop = window_bounds(index.strikes, lower, upper)
+    k = int(np.searchsorted(flips.positions, start))
+    if k < len(flips.positions) and flips.positions[k] + flips.run_length < stop:
+        return flips.strikes[k], flips.zero_strikes[k]
+    return None, None
@@ -0,0 +1,95 @@
+import queue
+import threading
+import time
+
+# Хаб живых обновлений: один поллер на тикер, пока у тикера есть подписчики (открытые страницы).
+# Поллер получает снапшоты через fetch (в app.py - refresh_market_snapshot, то есть тот же кэш
+# и single-flight, что и у колбэков) и рассылает каждый новый снапшот (по created_at) всем подписчикам.
+# Запросы к источнику данных не зависят от числа зрителей: на тикер идет один поток опроса,
+# а между воркерами загрузку одного снапшота объединяет общий кэш.
+#
+# Подписчик - очередь снапшотов. Медленный подписчик не задерживает рассылку: при полной очереди
+# самый старый снапшот выбрасывается, подписчику нужен только последний.
+
+# Минимальная пауза поллера между запросами (секунды), даже если снапшот уже устарел
+MIN_POLL_INTERVAL = 1.0
+
+
+class LiveHub:
+    def __init__(self, fetch, refresh_interval, queue_size=4):
+        self.fetch = fetch  # тикер -> снапшот с created_at
+        self.refresh_interval = refresh_interval  # тикер -> интервал обновления снапшота (секунды)
+        self.queue_size = queue_size
+        self._guard = threading.Lock()
+        self._subscribers = {}  # тикер -> множество очередей подписчиков
+        self._pollers = {}  # тикер -> событие остановки поллера
+        self._latest = {}  # тикер -> последний разосланный снапшот
+        self._stats = {'published': 0, 'dropped': 0, 'pollers_started': 0}
+
+    # Подписка на тикер: очередь, в которой сразу лежит последний снапшот тикера (если он есть).
+    # Первый подписчик запускает поллер тикера.
+    def subscribe(self, ticker):
+        events = queue.Queue(maxsize=self.queue_size)
+        with self._guard:
+            self._subscribers.setdefault(ticker, set()).add(events)
+            if ticker in self._latest:
+                events.put_nowait(self._latest[ticker])
+            if ticker not in self._pollers:
+                stop = threading.Event()
+                self._pollers[ticker] = stop
+                self._stats['pollers_started'] += 1
+                threading.Thread(target=self._poll, args=(ticker, stop), daemon=True,
+                                 name=f"live-poller:{ticker}").start()
+        return events
+
+    # Отписка; последний подписчик останавливает поллер тикера
+    def unsubscribe(self, ticker, events):
+        with self._guard:
+            subscribers = self._subscribers.get(ticker)
+            if subscribers is None:
+                return
+            subscribers.discard(events)
+            if not subscribers:
+                del self._subscribers[ticker]
+                self._latest.pop(ticker, None)
+                self._pollers.pop(ticker).set()
+
+    def publish(self, ticker, snapshot):
+        with self._guard:
+            self._latest[ticker] = snapshot
+            self._stats['published'] += 1
+            for events in self._subscribers.get(ticker, ()):
+                while True:
+                    try:
+                        events.put_nowait(snapshot)
+                        break
+                    except queue.Full:
+                        try:
+                            events.get_nowait()
+                            self._stats['dropped'] += 1
+                        except queue.Empty:
+                            pass
+
+    # Поллер тикера: следующий запрос - когда текущий снапшот устареет
+    def _poll(self, ticker, stop):
+        last_created_at = None
+        while not stop.is_set():
+            delay = self.refresh_interval(ticker)
+            try:
+                snapshot = self.fetch(ticker)
+            except Exception as e:
+                print(f"Ошибка живого обновления {ticker}: {e}")
+                snapshot = None
+
+            if snapshot is not None:
+                if snapshot.created_at != last_created_at and not stop.is_set():
+                    last_created_at = snapshot.created_at
+                    self.publish(ticker, snapshot)
+                delay = snapshot.created_at + delay - time.time()
+            stop.wait(max(delay, MIN_POLL_INTERVAL))
+
+    # Подписчики по тикерам и счетчики рассылки
+    def stats(self):
+        with self._guard:
+            return {'subscribers': {ticker: len(subscribers) for ticker, subscribers in self._subscribers.items()},
+                    **self._stats}
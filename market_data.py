@@ -0,0 +1,174 @@
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+import yfinance as yf
+
+from chain_format import cast_chain, decode_chain_arrays, encode_chain
+
+# Источники рыночных данных. Приложение обращается к данным только через провайдер:
+#   yahoo  - живые данные Yahoo Finance (по умолчанию)
+#   record - Yahoo с записью каждого ответа в каталог фикстур
+#   replay - ответы из записанных фикстур, без сети, с настраиваемой задержкой
+#
+# Фикстуры тикера лежат в {root}/{тикер}/: expirations.json, chain-{дата}.mpch (формат chain_format),
+# intraday.pkl (минутные бары, дописываются при каждой загрузке) и daily-{период}.pkl.
+
+
+class MarketDataProvider:
+    # Даты экспирации опционов (строки YYYY-MM-DD по возрастанию)
+    def expirations(self, ticker):
+        raise NotImplementedError
+
+    # Цепочка одной даты экспирации: словарь массивов chain_format (см. cast_chain)
+    def option_chain(self, ticker, expiration):
+        raise NotImplementedError
+
+    # Минутные бары за текущий день или начиная с момента start
+    def intraday_bars(self, ticker, start=None):
+        raise NotImplementedError
+
+    # Дневные бары за период ('1d', '3mo', ...)
+    def daily_bars(self, ticker, period):
+        raise NotImplementedError
+
+    # Текущая цена: последнее закрытие дневного бара (None, если данных нет)
+    def spot(self, ticker):
+        bars = self.daily_bars(ticker, '1d')
+        return bars['Close'].iloc[-1] if not bars.empty else None
+
+
+class YahooProvider(MarketDataProvider):
+    def expirations(self, ticker):
+        return list(yf.Ticker(ticker).options)
+
+    def option_chain(self, ticker, expiration):
+        option_chain = yf.Ticker(ticker).option_chain(expiration)
+        calls = option_chain.calls[['strike', 'openInterest', 'volume', 'impliedVolatility']].rename(
+            columns={'openInterest': 'Call OI', 'volume': 'Call Volume', 'impliedVolatility': 'Call IV'})
+        puts = option_chain.puts[['strike', 'openInterest', 'volume', 'impliedVolatility']].rename(
+            columns={'openInterest': 'Put OI', 'volume': 'Put Volume', 'impliedVolatility': 'Put IV'})
+
+        # Страйк без колла или пута: нулевые OI/объем и IV (гамма такой стороны будет нулевой)
+        return cast_chain(calls.merge(puts, on='strike', how='outer').sort_values(by='strike'))
+
+    def intraday_bars(self, ticker, start=None):
+        if start is None:
+            return yf.Ticker(ticker).history(period='1d', interval='1m')
+        return yf.Ticker(ticker).history(start=start, interval='1m')
+
+    def daily_bars(self, ticker, period):
+        return yf.Ticker(ticker).history(period=period, interval='1d')
+
+
+def _fixture_path(root, ticker, name):
+    return os.path.join(root, ticker, name)
+
+
+# Провайдер-обертка: отдает ответы внутреннего провайдера и сохраняет их как фикстуры
+class RecordingProvider(MarketDataProvider):
+    def __init__(self, inner, root):
+        self.inner = inner
+        self.root = root
+        self._lock = threading.Lock()
+
+    # Атомарная запись: читатель не увидит недописанный файл
+    def _write(self, ticker, name, write):
+        path = _fixture_path(self.root, ticker, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary_path = f"{path}.tmp-{threading.get_ident()}"
+        write(temporary_path)
+        os.replace(temporary_path, path)
+
+    def _write_bytes(self, ticker, name, payload):
+        def write(path):
+            with open(path, 'wb') as file:
+                file.write(payload)
+        self._write(ticker, name, write)
+
+    def expirations(self, ticker):
+        expirations = self.inner.expirations(ticker)
+        self._write_bytes(ticker, 'expirations.json', json.dumps(expirations).encode('utf-8'))
+        return expirations
+
+    def option_chain(self, ticker, expiration):
+        chain = self.inner.option_chain(ticker, expiration)
+        self._write_bytes(ticker, f"chain-{expiration}.mpch", encode_chain(chain))
+        return chain
+
+    # Минутные бары копятся в одной фикстуре: новые бары заменяют записанные с тем же временем
+    def intraday_bars(self, ticker, start=None):
+        bars = self.inner.intraday_bars(ticker, start)
+        if bars.empty:
+            return bars
+        with self._lock:
+            path = _fixture_path(self.root, ticker, 'intraday.pkl')
+            recorded = pd.read_pickle(path) if start is not None and os.path.exists(path) else None
+            if recorded is not None:
+                recorded = pd.concat([recorded[recorded.index < bars.index[0]], bars])
+            else:
+                recorded = bars
+            self._write(ticker, 'intraday.pkl', recorded.to_pickle)
+        return bars
+
+    def daily_bars(self, ticker, period):
+        bars = self.inner.daily_bars(ticker, period)
+        self._write(ticker, f"daily-{period}.pkl", bars.to_pickle)
+        return bars
+
+
+# Провайдер записанных фикстур. Фикстуры читаются с диска один раз и держатся в памяти,
+# latency (секунды) добавляется к каждому запросу, чтобы имитировать сеть.
+# Отсутствующая фикстура - ошибка, как и недоступный ответ Yahoo.
+class ReplayProvider(MarketDataProvider):
+    def __init__(self, root, latency=0.0):
+        self.root = root
+        self.latency = latency
+        self._fixtures = {}
+        self._lock = threading.Lock()
+
+    def _load(self, ticker, name, read):
+        if self.latency > 0:
+            time.sleep(self.latency)
+        key = (ticker, name)
+        with self._lock:
+            if key not in self._fixtures:
+                path = _fixture_path(self.root, ticker, name)
+                if not os.path.exists(path):
+                    raise LookupError(f"Нет фикстуры {path}")
+                self._fixtures[key] = read(path)
+            return self._fixtures[key]
+
+    @staticmethod
+    def _read_bytes(path):
+        with open(path, 'rb') as file:
+            return file.read()
+
+    def expirations(self, ticker):
+        return list(json.loads(self._load(ticker, 'expirations.json', self._read_bytes)))
+
+    def option_chain(self, ticker, expiration):
+        return decode_chain_arrays(self._load(ticker, f"chain-{expiration}.mpch", self._read_bytes))
+
+    # Вызывающий код может изменять полученные бары, поэтому отдается копия
+    def intraday_bars(self, ticker, start=None):
+        bars = self._load(ticker, 'intraday.pkl', pd.read_pickle)
+        if start is not None:
+            bars = bars[bars.index >= start]
+        return bars.copy()
+
+    def daily_bars(self, ticker, period):
+        return self._load(ticker, f"daily-{period}.pkl", pd.read_pickle).copy()
+
+
+# Функция создания провайдера по имени (MARKET_DATA_PROVIDER)
+def create_provider(name, fixtures_dir, latency=0.0):
+    if name == 'yahoo':
+        return YahooProvider()
+    if name == 'record':
+        return RecordingProvider(YahooProvider(), fixtures_dir)
+    if name == 'replay':
+        return ReplayProvider(fixtures_dir, latency)
+    raise ValueError(f"Неизвестный провайдер рыночных данных: {name}")
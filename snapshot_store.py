@@ -0,0 +1,198 @@
+import os
+import sqlite3
+import threading
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from chain_format import decode_chain_arrays
+
+# Хранилище истории снапшотов: каждый запрос цепочки опционов и каждая пачка минутных баров
+# дописываются в SQLite-файл {root}/{тикер}/{YYYY-MM-DD}.sqlite (день - торговый, по Нью-Йорку).
+#
+# Цепочка хранится в колоночном формате chain_format, сжатом zlib (~32 байта на страйк до сжатия).
+# Цепочка, не изменившаяся с прошлого запроса, повторно не записывается - при чтении на момент
+# времени берется последняя запись не позже него. Бары - по строке на минуту (ключ - время в секундах),
+# сформировавшийся заново последний бар перезаписывается.
+
+MARKET_TIMEZONE = 'America/New_York'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chains (
+    pulled_at REAL NOT NULL,
+    expiration TEXT NOT NULL,
+    payload BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chains_by_expiration ON chains (expiration, pulled_at);
+CREATE TABLE IF NOT EXISTS bars (
+    ts INTEGER PRIMARY KEY,
+    open REAL, high REAL, low REAL, close REAL, volume REAL
+);
+"""
+
+BAR_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+# Торговый день момента времени (секунды epoch) по Нью-Йорку
+def market_day(moment):
+    return pd.Timestamp(moment, unit='s', tz='UTC').tz_convert(MARKET_TIMEZONE).date()
+
+
+def _days_between(start, end):
+    return pd.date_range(market_day(start), market_day(end), freq='D').date
+
+
+class SnapshotStore:
+    def __init__(self, root, compression_level=6):
+        self.root = root
+        self.compression_level = compression_level
+        self._write_lock = threading.Lock()
+        # тикер -> (день, {экспирация: последняя записанная цепочка}); хранится только текущий день тикера
+        self._last_payloads = {}
+
+    def _path(self, ticker, day):
+        return os.path.join(self.root, ticker, f"{day.isoformat()}.sqlite")
+
+    def _connect(self, ticker, day, create=False):
+        path = self._path(ticker, day)
+        if not create and not os.path.exists(path):
+            return None
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        connection = sqlite3.connect(path)
+        if create:
+            connection.executescript(_SCHEMA)
+        return connection
+
+    # Запись цепочек одного запроса: {экспирация: байты chain_format (encode_chain)}
+    def write_chains(self, ticker, pulled_at, payloads):
+        day = market_day(pulled_at)
+        rows = []
+        with self._write_lock:
+            last_day, last_payloads = self._last_payloads.get(ticker, (None, None))
+            if last_day != day:
+                # Новый торговый день: цепочки прошлых дней (и истекших экспираций) больше не нужны
+                last_payloads = {}
+                self._last_payloads[ticker] = (day, last_payloads)
+            for expiration, payload in payloads.items():
+                if last_payloads.get(expiration) == payload:
+                    continue
+                last_payloads[expiration] = payload
+                rows.append((pulled_at, expiration, zlib.compress(payload, self.compression_level)))
+            if not rows:
+                return 0
+
+            connection = self._connect(ticker, day, create=True)
+            try:
+                with connection:
+                    connection.executemany("INSERT INTO chains VALUES (?, ?, ?)", rows)
+            finally:
+                connection.close()
+        return len(rows)
+
+    # Запись пачки минутных баров (индекс - время бара), разбивка по торговым дням
+    def write_bars(self, ticker, bars):
+        if bars.empty:
+            return 0
+        index = bars.index if bars.index.tz is not None else bars.index.tz_localize('UTC')
+        timestamps = index.as_unit('s').asi8
+        days = index.tz_convert(MARKET_TIMEZONE).date
+        values = bars[BAR_COLUMNS].to_numpy(dtype=float)
+
+        with self._write_lock:
+            for day in dict.fromkeys(days):
+                selected = days == day
+                rows = [(int(ts), *row) for ts, row in zip(timestamps[selected], values[selected].tolist())]
+                connection = self._connect(ticker, day, create=True)
+                try:
+                    with connection:
+                        connection.executemany("INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?)", rows)
+                finally:
+                    connection.close()
+        return len(timestamps)
+
+    # Чтение всех записей цепочек за интервал [start, end] (секунды epoch), по возрастанию времени
+    def read_chains(self, ticker, start, end, expirations=None):
+        records = []
+        for day in _days_between(start, end):
+            connection = self._connect(ticker, day)
+            if connection is None:
+                continue
+            try:
+                rows = connection.execute(
+                    "SELECT pulled_at, expiration, payload FROM chains WHERE pulled_at BETWEEN ? AND ? "
+                    "ORDER BY pulled_at", (start, end)).fetchall()
+            finally:
+                connection.close()
+            records.extend((pulled_at, expiration, decode_chain_arrays(zlib.decompress(payload)))
+                           for pulled_at, expiration, payload in rows
+                           if expirations is None or expiration in expirations)
+        return records
+
+    # Последние цепочки не позже момента moment в пределах его торгового дня: {экспирация: массивы}
+    def read_chains_at(self, ticker, moment, expirations=None):
+        connection = self._connect(ticker, market_day(moment))
+        if connection is None:
+            return {}
+        try:
+            rows = connection.execute(
+                "SELECT c.expiration, c.payload FROM chains c JOIN ("
+                "  SELECT expiration, MAX(pulled_at) AS pulled_at FROM chains WHERE pulled_at <= ? GROUP BY expiration"
+                ") latest ON c.expiration = latest.expiration AND c.pulled_at = latest.pulled_at",
+                (moment,)).fetchall()
+        finally:
+            connection.close()
+        return {expiration: decode_chain_arrays(zlib.decompress(payload))
+                for expiration, payload in rows
+                if expirations is None or expiration in expirations}
+
+    # Даты экспирации, цепочки которых записаны в торговый день момента moment (не позже него)
+    def read_expirations(self, ticker, moment):
+        connection = self._connect(ticker, market_day(moment))
+        if connection is None:
+            return []
+        try:
+            rows = connection.execute("SELECT DISTINCT expiration FROM chains WHERE pulled_at <= ? "
+                                      "ORDER BY expiration", (moment,)).fetchall()
+        finally:
+            connection.close()
+        return [expiration for (expiration,) in rows]
+
+    # Минутные бары за интервал [start, end] (секунды epoch) с индексом по Нью-Йорку
+    def read_bars(self, ticker, start, end):
+        rows = []
+        for day in _days_between(start, end):
+            connection = self._connect(ticker, day)
+            if connection is None:
+                continue
+            try:
+                rows.extend(connection.execute("SELECT * FROM bars WHERE ts BETWEEN ? AND ? ORDER BY ts",
+                                               (int(start), int(end))).fetchall())
+            finally:
+                connection.close()
+
+        if not rows:
+            return pd.DataFrame(columns=BAR_COLUMNS, index=pd.DatetimeIndex([], tz=MARKET_TIMEZONE))
+        data = np.array(rows, dtype=float)
+        index = pd.to_datetime(data[:, 0].astype(np.int64), unit='s', utc=True).tz_convert(MARKET_TIMEZONE)
+        return pd.DataFrame(data[:, 1:], index=index, columns=BAR_COLUMNS)
+
+    # Минутные бары торгового дня момента moment, не позже него
+    def read_day_bars(self, ticker, moment):
+        day_start = pd.Timestamp(market_day(moment), tz=MARKET_TIMEZONE).timestamp()
+        return self.read_bars(ticker, day_start, moment)
+
+    # Торговые дни, за которые есть записи по тикеру
+    def days(self, ticker):
+        directory = os.path.join(self.root, ticker)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[:-len('.sqlite')] for name in os.listdir(directory) if name.endswith('.sqlite'))
+
+    # Размер хранилища на диске (байты), по тикеру или целиком
+    def disk_usage(self, ticker=None):
+        directory = os.path.join(self.root, ticker) if ticker else self.root
+        total = 0
+        for path, _, files in os.walk(directory):
+            total += sum(os.path.getsize(os.path.join(path, name)) for name in files)
+        return total
@@ -0,0 +1,114 @@
+# Проверка компактного формата цепочки (chain_format): кодирование и чтение без потерь,
+# приведение типов колонок и отказ на чужих данных. Через этот формат проходят все цепочки
+# в кэше, фикстуры провайдера replay и история снапшотов.
+# Запуск из корня репозитория: python -m pytest -q tests
+import os
+import pickle
+import struct
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from chain_format import (CHAIN_COLUMN_DTYPES, CHAIN_FORMAT_MAGIC, CHAIN_FORMAT_VERSION, cast_chain, decode_chain,
+                          decode_chain_arrays, encode_chain)
+
+
+# Цепочка в том виде, в каком ее отдает Yahoo: OI и объемы - float с пропусками, IV с пропусками
+def yahoo_chain(strike_count, seed=3):
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        'strike': np.round(np.linspace(5000.0, 6000.0, strike_count), 2),
+        'Call OI': rng.integers(0, 50000, strike_count).astype(float),
+        'Call Volume': rng.integers(0, 50000, strike_count).astype(float),
+        'Call IV': rng.uniform(0.05, 1.5, strike_count),
+        'Put OI': rng.integers(0, 50000, strike_count).astype(float),
+        'Put Volume': rng.integers(0, 50000, strike_count).astype(float),
+        'Put IV': rng.uniform(0.05, 1.5, strike_count),
+    })
+    if strike_count:
+        frame.loc[::3, 'Call IV'] = np.nan
+        frame.loc[1::4, 'Put Volume'] = np.nan
+    return frame
+
+
+@pytest.mark.parametrize('strike_count', [1, 2, 7, 500])
+def test_round_trip(strike_count):
+    frame = yahoo_chain(strike_count)
+    arrays = decode_chain_arrays(encode_chain(cast_chain(frame)))
+
+    assert list(arrays) == [name for name, _ in CHAIN_COLUMN_DTYPES]
+    for name, dtype in CHAIN_COLUMN_DTYPES:
+        assert arrays[name].dtype == np.dtype(dtype)
+        assert len(arrays[name]) == strike_count
+    # Страйк хранится точно, IV - в float32
+    np.testing.assert_array_equal(arrays['strike'], frame['strike'].to_numpy())
+    np.testing.assert_allclose(arrays['Put IV'], frame['Put IV'].to_numpy(), rtol=1e-6)
+
+
+def test_missing_values_become_zeros():
+    frame = yahoo_chain(12)
+    arrays = decode_chain_arrays(encode_chain(cast_chain(frame)))
+
+    missing_iv = frame['Call IV'].isna().to_numpy()
+    assert missing_iv.any()
+    assert (arrays['Call IV'][missing_iv] == 0).all()
+    assert not np.isnan(arrays['Call IV']).any()
+    missing_volume = frame['Put Volume'].isna().to_numpy()
+    assert (arrays['Put Volume'][missing_volume] == 0).all()
+
+
+def test_open_interest_and_volume_cast_to_int32():
+    frame = yahoo_chain(5)
+    frame['Call OI'] = [0.0, 1.0, 12345.0, 2 ** 31 - 1, 7.0]
+    chain = cast_chain(frame)
+    for name in ['Call OI', 'Call Volume', 'Put OI', 'Put Volume']:
+        assert chain[name].dtype == np.int32
+
+    arrays = decode_chain_arrays(encode_chain(chain))
+    assert arrays['Call OI'].tolist() == [0, 1, 12345, 2 ** 31 - 1, 7]
+
+
+def test_empty_chain():
+    arrays = decode_chain_arrays(encode_chain(cast_chain(yahoo_chain(0))))
+    assert all(len(arrays[name]) == 0 for name, _ in CHAIN_COLUMN_DTYPES)
+    assert decode_chain(encode_chain(cast_chain(yahoo_chain(0)))).empty
+
+
+def test_columns_are_aligned_and_read_only():
+    encoded = encode_chain(cast_chain(yahoo_chain(7)))
+    assert len(encoded) % 8 == 0
+    frame = decode_chain(encoded)
+    assert list(frame.columns) == [name for name, _ in CHAIN_COLUMN_DTYPES]
+    # Массивы ссылаются на исходные байты без копирования
+    with pytest.raises(ValueError):
+        decode_chain_arrays(encoded)['strike'][0] = 0.0
+
+
+def test_decodes_from_memoryview_slice():
+    encoded = encode_chain(cast_chain(yahoo_chain(9)))
+    buffer = memoryview(b'\0' * 8 + encoded)[8:]
+    np.testing.assert_array_equal(decode_chain_arrays(buffer)['strike'], decode_chain_arrays(encoded)['strike'])
+
+
+def test_rejects_bad_magic():
+    encoded = bytearray(encode_chain(cast_chain(yahoo_chain(3))))
+    encoded[:4] = b'XXXX'
+    with pytest.raises(ValueError):
+        decode_chain_arrays(bytes(encoded))
+
+
+def test_rejects_unknown_version():
+    encoded = bytearray(encode_chain(cast_chain(yahoo_chain(3))))
+    struct.pack_into('<4sH', encoded, 0, CHAIN_FORMAT_MAGIC, CHAIN_FORMAT_VERSION + 1)
+    with pytest.raises(ValueError):
+        decode_chain_arrays(bytes(encoded))
+
+
+def test_rejects_pickled_dataframe():
+    # Запись старого формата кэша (pickle DataFrame) не должна читаться как цепочка
+    with pytest.raises(ValueError):
+        decode_chain_arrays(pickle.dumps(yahoo_chain(3), pickle.HIGHEST_PROTOCOL))
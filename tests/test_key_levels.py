@@ -0,0 +1,177 @@
+# Проверка движка key_levels против прежней логики колбэков: фильтр DataFrame и idxmax на каждый уровень,
+# поиск G-Flip вложенным циклом и суммы окна через маску и sum().
+# Запуск из корня репозитория: python -m pytest -q tests
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from key_levels import (LEVEL_METRICS, LEVEL_NAMES, MAX_LEVELS, build_level_index, compute_key_levels,
+                        find_gamma_flips, first_gamma_flip, window_sums)
+
+SPOT = 100.0
+
+
+# Цепочка с малым диапазоном значений: много равных максимумов и нулей Net GEX
+def random_chain(rng, strike_count):
+    strikes = np.round(np.linspace(SPOT * 0.8, SPOT * 1.2, strike_count), 1)
+    return pd.DataFrame({
+        'strike': strikes,
+        'Call OI': rng.integers(0, 5, strike_count),
+        'Call Volume': rng.integers(0, 5, strike_count),
+        'Put OI': rng.integers(0, 5, strike_count),
+        'Put Volume': rng.integers(0, 5, strike_count),
+        'Net GEX': rng.integers(-3, 4, strike_count).astype(float),
+        'AG': rng.integers(0, 5, strike_count).astype(float),
+    })
+
+
+def chain_from_net_gex(net_gex):
+    size = len(net_gex)
+    return pd.DataFrame({
+        'strike': np.arange(size, dtype=float) * 5 + 50,
+        **{column: np.zeros(size) for column in LEVEL_METRICS if column != 'Net GEX'},
+        'Net GEX': np.asarray(net_gex, dtype=float),
+    })
+
+
+# Страйк idxmax / idxmin колонки (пустой фрейм - None), как в колбэках до key_levels.py
+def pandas_strike(frame, column, how='max'):
+    if frame.empty:
+        return None
+    position = frame[column].idxmax() if how == 'max' else frame[column].idxmin()
+    return frame.loc[position, 'strike']
+
+
+def pandas_levels(options_data, lower, upper, spot):
+    window = options_data[(options_data['strike'] >= lower) & (options_data['strike'] <= upper)]
+    levels = {name: pandas_strike(window, column) for column, name in zip(LEVEL_METRICS, MAX_LEVELS)}
+    levels['min_net_gex'] = pandas_strike(window, 'Net GEX', 'min')
+
+    near_above = options_data[(options_data['strike'] >= spot) & (options_data['strike'] <= spot * 1.01)]
+    levels['main_resistance'] = pandas_strike(near_above, 'Call Volume')
+    near_below = options_data[(options_data['strike'] <= spot) & (options_data['strike'] >= spot * 0.99)]
+    levels['main_support'] = pandas_strike(near_below, 'Put Volume')
+
+    above = window[window['strike'] > spot]
+    below = window[window['strike'] < spot]
+    levels['above_max_ag'] = pandas_strike(above, 'AG')
+    levels['below_max_ag'] = pandas_strike(below, 'AG')
+    levels['above_positive_net_gex'] = pandas_strike(above[above['Net GEX'] > 0], 'Net GEX')
+    levels['below_negative_net_gex'] = pandas_strike(below[below['Net GEX'] < 0], 'Net GEX', 'min')
+    return levels
+
+
+def engine_levels(index, lower, upper, spot):
+    levels = compute_key_levels(index, lower, upper, spot)
+    result = {name: levels[name] for name in MAX_LEVELS + ['min_net_gex']}
+    result['main_resistance'] = compute_key_levels(index, spot, spot * 1.01)['max_call_volume']
+    result['main_support'] = compute_key_levels(index, spot * 0.99, spot)['max_put_volume']
+    result['above_max_ag'] = levels['above']['max_ag']
+    result['below_max_ag'] = levels['below']['max_ag']
+    result['above_positive_net_gex'] = levels['above']['positive_net_gex']
+    result['below_negative_net_gex'] = levels['below']['negative_net_gex']
+    return result
+
+
+# Прежний поиск G-Flip: первый страйк знака before, за которым run_length страйков знака after
+def loop_gamma_flip(net_gex, strikes, run_length, direction):
+    for i in range(len(net_gex) - run_length):
+        if direction == 'up':
+            found = net_gex[i] < 0 and all(net_gex[i + j] > 0 for j in range(1, run_length + 1))
+        else:
+            found = net_gex[i] > 0 and all(net_gex[i + j] < 0 for j in range(1, run_length + 1))
+        if found:
+            return strikes[i]
+    return None
+
+
+@pytest.mark.parametrize('seed', range(20))
+@pytest.mark.parametrize('spot', [SPOT, SPOT + 0.05, SPOT * 0.85])
+def test_levels_match_pandas(seed, spot):
+    options_data = random_chain(np.random.default_rng(seed), 120)
+    index = build_level_index(options_data)
+    for lower, upper in [(spot * 0.9775, spot * 1.0225), (spot * 0.95, spot), (spot, spot * 1.05)]:
+        assert engine_levels(index, lower, upper, spot) == pandas_levels(options_data, lower, upper, spot)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_window_sums_match_pandas(seed):
+    options_data = random_chain(np.random.default_rng(seed), 120)
+    index = build_level_index(options_data)
+    for lower, upper in [(SPOT * 0.9775, SPOT * 1.0225), (SPOT * 0.8, SPOT * 1.2), (SPOT * 1.3, SPOT * 1.4)]:
+        window = options_data[(options_data['strike'] >= lower) & (options_data['strike'] <= upper)]
+        sums = window_sums(index, lower, upper)
+        assert sums['strikes'] == len(window)
+        for column in LEVEL_METRICS:
+            assert sums[column] == pytest.approx(float(window[column].sum()))
+
+
+@pytest.mark.parametrize('seed', range(30))
+@pytest.mark.parametrize('direction', ['up', 'down'])
+@pytest.mark.parametrize('run_length', [1, 3, 6])
+def test_gamma_flip_matches_loop(seed, direction, run_length):
+    rng = np.random.default_rng(seed)
+    # Длинные серии одного знака, чтобы зоны G-Flip встречались часто
+    net_gex = np.repeat(rng.choice([-1.0, 0.0, 1.0], 40), rng.integers(1, 9, 40)) * rng.uniform(1, 10)
+    options_data = chain_from_net_gex(net_gex)
+    index = build_level_index(options_data)
+    flips = find_gamma_flips(index, run_length, direction)
+
+    strikes = options_data['strike'].to_numpy()
+    for lower, upper in [(None, None), (strikes[10], strikes[-10]), (strikes[len(strikes) // 2], None)]:
+        window = options_data[(options_data['strike'] >= (lower if lower is not None else -np.inf))
+                              & (options_data['strike'] <= (upper if upper is not None else np.inf))]
+        expected = loop_gamma_flip(window['Net GEX'].to_numpy(), window['strike'].to_numpy(), run_length, direction)
+        assert first_gamma_flip(index, flips, lower, upper)[0] == expected
+
+
+def test_gamma_flip_run_length_boundaries():
+    index = build_level_index(chain_from_net_gex([-1, 2, 2, 2, -1, 1, 1, 1, 1]))
+    flips = find_gamma_flips(index, run_length=3, direction='up')
+    # Серия ровно из run_length страйков подходит
+    assert flips.positions.tolist() == [0, 4]
+    # Серия на один страйк короче run_length - нет; серия до конца цепочки - да
+    assert find_gamma_flips(index, run_length=4, direction='up').positions.tolist() == [4]
+    # Окно, обрезающее серию, зону не содержит
+    assert first_gamma_flip(index, flips, upper=index.strikes[2]) == (None, None)
+    strike, zero_strike = first_gamma_flip(index, flips)
+    assert strike == index.strikes[0]
+    assert zero_strike == pytest.approx(index.strikes[0] + 5 / 3)
+
+
+@pytest.mark.parametrize('strike_count', [0, 1])
+def test_empty_and_single_strike(strike_count):
+    options_data = chain_from_net_gex([-2.0][:strike_count])
+    index = build_level_index(options_data)
+
+    levels = compute_key_levels(index, spot=SPOT)
+    if strike_count == 0:
+        assert all(levels[name] is None for name in LEVEL_NAMES)
+    else:
+        strike = options_data['strike'].iloc[0]
+        assert all(levels[name] == strike for name in MAX_LEVELS + ['min_net_gex', 'negative_net_gex'])
+        assert levels['positive_net_gex'] is None
+        assert levels['below']['max_ag'] == strike
+    assert all(levels['above'][name] is None for name in LEVEL_NAMES)
+
+    sums = window_sums(index)
+    assert sums['strikes'] == strike_count
+    assert sums['Net GEX'] == (-2.0 if strike_count else 0.0)
+
+    for direction in ['up', 'down']:
+        flips = find_gamma_flips(index, direction=direction)
+        assert len(flips.positions) == 0
+        assert first_gamma_flip(index, flips) == (None, None)
+
+
+def test_invalid_gamma_flip_arguments():
+    index = build_level_index(chain_from_net_gex([1.0, -1.0]))
+    with pytest.raises(ValueError):
+        find_gamma_flips(index, run_length=0)
+    with pytest.raises(ValueError):
+        find_gamma_flips(index, direction='sideways')
@@ -0,0 +1,4 @@
+# Точка входа для WSGI-сервера (gunicorn): gunicorn -c gunicorn.conf.py wsgi:server
+from app import app
+
+server = app.server